@@ -0,0 +1,52 @@
+"""
+Async variants of the BFG API endpoints, included under /async/.
+
+Each path matches the synchronous endpoint of the same name in urls.py.
+Static data, sprites and csrf are served from memory and are only
+available synchronously.
+"""
+
+from django.urls import path
+
+from .async_views import AsyncAction
+
+
+def action(route: str, name: str, **kwargs):
+    return path(route, AsyncAction.as_view(action=name, **kwargs))
+
+
+urlpatterns = [
+    # User session
+    action("user-login/", "user_login", pass_ip_address=True),
+    action("user-seat/", "seat_assigned"),
+    action("user-logout/", "user_logout", pass_ip_address=True),
+    action("user-status/", "get_user_status", http_method_names=["get"]),
+    # Room / Setup
+    action("get-user-set-hands/", "get_user_set_hands"),
+    action("set-user-set-hands/", "set_user_set_hands"),
+    # Boards
+    action("new-board/", "new_board"),
+    action("restart-board/", "restart_board"),
+    action("replay-board/", "replay_board"),
+    action("room-board/", "room_board"),
+    action("pbn-board/", "board_from_pbn"),
+    # History
+    action("use-history-board/", "history_board"),
+    action("get-history/", "get_history"),
+    action("rotate-boards/", "rotate_boards"),
+    # Bidding
+    action("bid-made/", "bid_made"),
+    action("use-suggestion/", "use_bid", args=(True,)),
+    action("use-own-bid/", "use_bid", args=(False,)),
+    # Card play
+    action("cardplay/", "cardplay_setup"),
+    action("card-played/", "card_played"),
+    action("claim/", "claim"),
+    action("compare-scores/", "compare_scores"),
+    # Utilities / Admin
+    action("undo/", "undo"),
+    action("database-update/", "database_update"),
+    # Messaging
+    action("message-sent/", "message_sent"),
+    action("message-received/", "message_received"),
+]
@@ -0,0 +1,122 @@
+# bfg_api/async_views.py
+"""
+Async variants of the API views, served under /async/.
+
+Actions that need a room are run in the engine pool (common.engine_pool):
+the room is fetched in a thread, the action runs in a worker process with
+the room's cached board and snapshot, and the fields it changed are written
+back here, where its board and context are then cached. The event loop is
+never blocked by an engine, so one slow claim does not hold up the
+requests behind it. Actions that need no room are cheap and run in a
+thread.
+
+If the partner's request writes the room while an action runs, the action
+is run again on the new row, as handle_request does (see
+common.unit_of_work).
+
+Time spent waiting for and running in the pool is recorded as the engine
+phase; the worker's own phases are not visible to the metrics.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+import common.application as app
+from bfg_api.views import conflict_response
+from common.constants import ROOM_WRITE_ATTEMPTS
+from common.engine_pool import (
+    EnginePoolBusyError,
+    cached_entries,
+    engine_pool,
+    run_action,
+)
+from common.metrics import ENGINE, PARSE, SERIALIZE, measure
+from common.unit_of_work import (
+    StaleRoomError,
+    UnitOfWork,
+    unit_of_work,
+)
+from common.utilities import req_from_json, select_fields
+from config.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds a client should wait before retrying when the pool is full
+RETRY_AFTER = 1
+
+
+async def handle_async_request(request, action: str, *args) -> JsonResponse:
+    func = getattr(app, action)
+    try:
+        raw = request.body or b"{}"
+        with measure(PARSE):
+            req = req_from_json(raw, getattr(func, "needs_room", True))
+        logger.info("handle_async_request", func=action)
+        if req.needs_room:
+            response = await _run_in_pool(req, action, args)
+        else:
+            response = await sync_to_async(_run_action)(func, req, args)
+        response = select_fields(req, response)
+    except StaleRoomError:
+        return conflict_response(action)
+    except EnginePoolBusyError:
+        logger.warning(
+            "engine-pool busy", func=action, in_flight=engine_pool.in_flight
+        )
+        return JsonResponse(
+            {"error": "busy"},
+            status=503,
+            headers={"Retry-After": str(RETRY_AFTER)},
+        )
+    except Exception:
+        logger.exception("handle_async_request failed", func=action)
+        raise
+    with measure(SERIALIZE):
+        return JsonResponse(response, safe=False)
+
+
+async def _run_in_pool(req, action: str, args: tuple) -> object:
+    """Run the action in the engine pool and write the room's changes."""
+    for attempt in range(1, ROOM_WRITE_ATTEMPTS + 1):
+        await req.aroom()
+        cached = cached_entries(req)
+        with measure(ENGINE):
+            (response, changes, calls) = await engine_pool.run(
+                run_action, action, req, args, cached
+            )
+        unit = UnitOfWork.from_changes(changes, calls)
+        try:
+            await sync_to_async(unit.flush)()
+            return response
+        except StaleRoomError:
+            if attempt == ROOM_WRITE_ATTEMPTS:
+                raise
+            # The partner's request wrote the room first: run on its row
+            req.room = None
+
+
+def _run_action(func, req, args):
+    with unit_of_work():
+        return func(req, *args)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAction(View):
+    """Run one application action; configured in async_urls."""
+
+    action = ""
+    args = ()
+    pass_ip_address = False
+    http_method_names = ["post"]
+
+    async def get(self, request):
+        return await self.post(request)
+
+    async def post(self, request):
+        args = self.args
+        if self.pass_ip_address:
+            args = (request.META.get("REMOTE_ADDR"), *args)
+        return await handle_async_request(request, self.action, *args)
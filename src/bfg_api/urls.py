@@ -11,7 +11,7 @@ Conventions:
 - Client must call /ensure-csrf/ once before POSTing
 """
 
-from django.urls import path
+from django.urls import include, path
 
 from . import views
 
@@ -19,7 +19,11 @@ urlpatterns = [
     # Bootstrap / Static
     path("ensure-csrf/", views.ensure_csrf),
     path("static-data/", views.StaticData.as_view()),
+    path(
+        "sprites/<str:file_name>", views.SpriteSheet.as_view(), name="sprite"
+    ),
     path("amsterdam/", views.DebugView.as_view()),
+    path("metrics/", views.Metrics.as_view()),
     # User session
     path("user-login/", views.UserLogin.as_view()),
     path("user-seat/", views.UserSeat.as_view()),
@@ -53,4 +57,8 @@ urlpatterns = [
     # Messaging
     path("message-sent/", views.MessageSent.as_view()),
     path("message-received/", views.MessageReceived.as_view()),
+    # Several of the actions above in one request
+    path("batch/", views.Batch.as_view()),
+    # Async variants of the endpoints above
+    path("async/", include("bfg_api.async_urls")),
 ]
@@ -1,13 +1,40 @@
 # bfg_appi/views.py
-from django.http import HttpResponse, JsonResponse
+import json
+
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+)
 from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
 from django.views import View
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 
 import common.application as app
-from common.utilities import req_from_json
+from common.activity import activity_buffer
+from common.constants import SPRITE_MAX_AGE, STATIC_DATA_MAX_AGE
+from common.double_dummy import solutions
+from common.images import SPRITES
+from common.metrics import CONTENT_TYPE, PARSE, SERIALIZE, measure, metrics
+from common.payload import IDENTITY, Payload
+from common.unit_of_work import (
+    StaleRoomError,
+    run_in_unit_of_work,
+    unit_of_work,
+)
+from common.utilities import (
+    GameRequest,
+    req_from_dict,
+    req_from_json,
+    room_etag,
+    room_state_etag,
+    select_fields,
+)
 from config.logging import get_logger
 
 logger = get_logger(__name__)
@@ -27,13 +54,32 @@ def ensure_csrf(request):
 
 
 def handle_request(request, func, *args) -> JsonResponse:
-    try:
-        raw = request.body or b"{}"
-        req = req_from_json(raw)
+    return _handle_request(request, func, *args)[0]
+
+
+def _handle_request(
+    request, func, *args
+) -> tuple[JsonResponse, GameRequest | None]:
+    """Return handle_request's response and the request it last ran."""
+    reqs = []
+
+    def run():
+        with measure(PARSE):
+            req = req_from_json(raw, getattr(func, "needs_room", True))
+        reqs.append(req)
         logger.info(
             "handle_request", func=getattr(func, "__name__", repr(func))
         )
-        return JsonResponse(func(req, *args), safe=False)
+        return select_fields(req, func(req, *args))
+
+    try:
+        raw = request.body or b"{}"
+        response = run_in_unit_of_work(run)
+        with measure(SERIALIZE):
+            return JsonResponse(response, safe=False), reqs[-1]
+    except StaleRoomError:
+        func_name = getattr(func, "__name__", repr(func))
+        return conflict_response(func_name), None
     except Exception:
         logger.exception(
             "handle_request failed", func=getattr(func, "__name__", repr(func))
@@ -41,6 +87,134 @@ def handle_request(request, func, *args) -> JsonResponse:
         raise
 
 
+def handle_conditional_request(request, func) -> HttpResponse:
+    """
+    Run handle_request for an endpoint that clients poll.
+
+    The response carries an ETag for the room's state. A request whose
+    If-None-Match still matches gets a 304 without the board being loaded
+    or the archive parsed, though it still counts as the user's activity.
+    A full response is tagged with the versions of the room it was built
+    from, not queried again, so that a partner's write in between is not
+    taken as already seen.
+    """
+    raw = request.body or b"{}"
+    data = json.loads(raw)
+    etag = room_state_etag(data.get("room_name", ""), func.__name__, raw)
+    if etag and etag in parse_etags(request.headers.get("If-None-Match", "")):
+        # No GameRequest is built, so record the poll as activity here
+        activity_buffer.touch(data.get("username", ""))
+        response = HttpResponseNotModified()
+    else:
+        response, req = _handle_request(request, func)
+        etag = None
+        if req is not None:
+            etag = room_etag(req.room, func.__name__, raw)
+    if etag:
+        response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def handle_batch(request) -> JsonResponse:
+    """
+    Run several actions against one room, in order, in one unit of work.
+
+    The body holds the shared request parameters and a list of actions:
+
+        {"username": ..., "room_name": ..., "seat": ..., "mode": ...,
+         "actions": [{"action": "bid-made", "params": {"bid": "P"}},
+                     {"action": "use-suggestion"}, {"action": "room-board"}]}
+
+    Each action's params are laid over the shared ones. The room is loaded
+    once and written once, and the board is only rebuilt from json for the
+    first action (the rest take it from the board cache). If any action
+    fails the whole batch is discarded, and if the partner's request wrote
+    the room first the whole batch is run again.
+    """
+    data = json.loads(request.body or b"{}")
+    steps = data.pop("actions", [])
+    error = _batch_error(steps)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    def run():
+        results = []
+        room = None
+        for step in steps:
+            (func, args) = app.BATCH_ACTIONS[step["action"]]
+            with measure(PARSE):
+                req = req_from_dict(
+                    {**data, **step.get("params", {})},
+                    getattr(func, "needs_room", True),
+                )
+            logger.info("handle_batch", func=func.__name__)
+            if req.needs_room:
+                if room is None:
+                    room = req.room
+                req.room = room
+            result = select_fields(req, func(req, *args))
+            results.append({"action": step["action"], "result": result})
+        return results
+
+    try:
+        results = run_in_unit_of_work(run)
+    except StaleRoomError:
+        return conflict_response("batch")
+    except Exception:
+        logger.exception("handle_batch failed", actions=len(steps))
+        raise
+    with measure(SERIALIZE):
+        return JsonResponse({"results": results})
+
+
+def conflict_response(func_name: str) -> JsonResponse:
+    """Answer a request whose room its partner kept writing first."""
+    logger.warning("room write conflict", func=func_name)
+    return JsonResponse({"error": "conflict"}, status=409)
+
+
+def _batch_error(steps: object) -> str:
+    if not isinstance(steps, list) or not steps:
+        return "actions must be a non-empty list"
+    for step in steps:
+        if not isinstance(step, dict):
+            return "each action must be an object"
+        if step.get("action") not in app.BATCH_ACTIONS:
+            return f"unknown action: {step.get('action')}"
+        params = step.get("params", {})
+        if not isinstance(params, dict):
+            return "an action's params must be an object"
+        if "room_name" in params:
+            return "actions share the batch's room_name"
+    return ""
+
+
+def payload_response(request, payload: Payload, max_age: int) -> HttpResponse:
+    """Return payload in the client's encoding, or 304 if it has it."""
+    if payload.etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        accept_encoding = request.headers.get("Accept-Encoding", "")
+        encoding = payload.negotiate(accept_encoding)
+        response = HttpResponse(
+            payload.encodings[encoding], content_type="application/json"
+        )
+        if encoding != IDENTITY:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = payload.etag
+    patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+class Metrics(View):
+    def get(self, request):
+        """Return the latency histograms and double dummy cache counts."""
+        text = metrics.render() + solutions.render()
+        return HttpResponse(text, content_type=CONTENT_TYPE)
+
+
 class DebugView(View):
     def get(self, request):
         output = f"""
@@ -58,9 +232,28 @@ class DebugView(View):
 class StaticData(View):
     def get(self, request):
         print("StaticData.get", request.META.get("REMOTE_ADDR"))
-        return JsonResponse(
-            app.static_data(request.META.get("REMOTE_ADDR")), safe=False
+        payload = app.static_data(request.META.get("REMOTE_ADDR"))
+        return payload_response(request, payload, STATIC_DATA_MAX_AGE)
+
+
+class SpriteSheet(View):
+    def get(self, request, file_name):
+        """Return a card or call sprite sheet by its content-hashed name."""
+        sprite = SPRITES.get(file_name)
+        if sprite is None:
+            raise Http404(file_name)
+        response = HttpResponse(sprite.png, content_type="image/png")
+        response["ETag"] = f'"{sprite.digest}"'
+        patch_cache_control(
+            response, public=True, max_age=SPRITE_MAX_AGE, immutable=True
         )
+        return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class Batch(View):
+    def post(self, request):
+        return handle_batch(request)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -87,9 +280,10 @@ class UserStatus(View):
             "UserStatus.get", remote_addr=request.META.get("REMOTE_ADDR")
         )
         raw = request.body or b"{}"
-        req = req_from_json(raw)
         try:
-            response = app.get_user_status(req)
+            with unit_of_work():
+                req = req_from_json(raw, needs_room=False)
+                response = app.get_user_status(req)
             return JsonResponse(response, safe=False)
         except Exception as e:
             print("UserStatus.get error:", e)
@@ -130,7 +324,7 @@ class NewBoard(View):
 class RoomBoard(View):
     def post(self, request):
         logger.info("RoomBoard.post")
-        return handle_request(request, app.room_board)
+        return handle_conditional_request(request, app.room_board)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -146,7 +340,7 @@ class GetHistory(View):
     def post(self, request):
         """Return board archive."""
         logger.info("GetHistory.post")
-        return handle_request(request, app.get_history)
+        return handle_conditional_request(request, app.get_history)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -0,0 +1,101 @@
+"""
+Write-behind buffer for user activity.
+
+Every API call records the caller's last activity. Rather than saving the
+User on each request, the time is held in memory per username, coalescing
+repeated calls, and written in one bulk update every
+ACTIVITY_FLUSH_SECONDS and when the process exits.
+
+Readers (get_user_status) ask the buffer first, because the value in the
+database can be up to one flush interval old.
+"""
+
+import atexit
+import threading
+from datetime import datetime
+
+from django.db import connection
+from django.utils import timezone
+
+from common.constants import ACTIVITY_FLUSH_SECONDS
+from common.models import User
+from config.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ActivityBuffer:
+    """Coalesce last_activity updates and write them in bulk."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._pending: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def touch(self, username: str, when: datetime | None = None) -> None:
+        """Record activity for username, to be written on the next flush."""
+        if not username:
+            return
+        when = when or timezone.now()
+        with self._lock:
+            self._pending[username] = when
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def last_activity(self, username: str) -> datetime | None:
+        """Return the buffered activity for username, if not yet flushed."""
+        with self._lock:
+            return self._pending.get(username)
+
+    def flush(self) -> int:
+        """Write all pending activity and return the number of users."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            _write_activity(pending)
+        except Exception:
+            self._restore(pending)
+            raise
+        return len(pending)
+
+    def _restore(self, pending: dict[str, datetime]) -> None:
+        """Put back activity that failed to flush, unless since replaced."""
+        with self._lock:
+            for username, when in pending.items():
+                self._pending.setdefault(username, when)
+
+    def _run(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("activity-flush failed")
+        finally:
+            connection.close()
+
+
+def _write_activity(pending: dict[str, datetime]) -> None:
+    users = list(User.objects.filter(username__in=pending))
+    for user in users:
+        user.last_activity = pending[user.username]
+    User.objects.bulk_update(users, ["last_activity"])
+
+    existing = {user.username for user in users}
+    User.objects.bulk_create(
+        [
+            User(username=username, last_activity=when)
+            for username, when in pending.items()
+            if username not in existing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+activity_buffer = ActivityBuffer(ACTIVITY_FLUSH_SECONDS)
+atexit.register(activity_buffer.flush)
@@ -18,88 +18,105 @@ Conventions:
 """
 
 import json
-from datetime import timedelta
+from datetime import datetime, timedelta
+from functools import cache
 from importlib.metadata import version
+from typing import TYPE_CHECKING
 
-from bfgdealer import DUO_SET_HANDS, SOLO_SET_HANDS, Board
 from bridgeobjects import CALLS
+from django.urls import reverse
 from django.utils import timezone
 
 from _version import __version__ as api_version
-from common.archive import (
-    get_board_file_from_room,
-    get_history_boards_text,
-    get_user_archive_list,
-    rotate_archived_boards,
-    save_boards_file_to_room,
-)
-from common.bidding import get_bid_context, get_bid_made
-from common.board import (
-    get_board_from_pbn,
-    get_history_board,
-    get_new_board,
-    get_room_board,
-    restart_board_context,
-    undo_context,
-)
-from common.cardplay import (
-    card_played_context,
-    claim_context,
-    compare_scores_context,
-    get_cardplay_context,
-    replay_board_context,
-)
+from common.activity import activity_buffer
 from common.constants import PACKAGES, SOURCES
-from common.images import CARD_IMAGES, CURSOR
-from common.utilities import GameRequest, get_user_from_username
+from common.images import CALL_SPRITE, CARD_SPRITE, CURSOR, Sprite
+from common.lazy import LazyModule
+from common.payload import Payload
+from common.unit_of_work import save_fields
+from common.utilities import (
+    GameRequest,
+    get_user_from_username,
+    room_not_required,
+)
 from config.logging import get_logger
 
+if TYPE_CHECKING:
+    from bfgdealer import Board
+
 logger = get_logger(__name__)
 
+# The engines are imported on first use: see common.lazy
+archive = LazyModule("common.archive")
+bidding = LazyModule("common.bidding")
+board = LazyModule("common.board")
+cardplay = LazyModule("common.cardplay")
+dealer = LazyModule("bfgdealer")
+
 
 # ─────────────────────────────
 # Static / bootstrap
 # ─────────────────────────────
-def static_data(ip_address: str) -> dict[str, object]:
-    """Return a dict of static data."""
+def static_data(ip_address: str) -> Payload:
+    """Return the static data, serialised and compressed once per process."""
     logger.info("Static data", ip_address=ip_address)
+    return _static_payload()
+
+
+@cache
+def _static_payload() -> Payload:
+    return Payload.from_content(_static_context())
+
+
+def _static_context() -> dict[str, object]:
     context = {
-        "card_images": CARD_IMAGES,
+        "card_sprite": _sprite_manifest(CARD_SPRITE),
+        "call_sprite": _sprite_manifest(CALL_SPRITE),
         "cursor": CURSOR,
         "calls": CALLS,
-        "solo_set_hands": SOLO_SET_HANDS,
-        "duo_set_hands": DUO_SET_HANDS,
+        "solo_set_hands": dealer.SOLO_SET_HANDS,
+        "duo_set_hands": dealer.DUO_SET_HANDS,
         "sources": SOURCES,
         "versions": package_versions(),
     }
     return context
 
 
+def _sprite_manifest(sprite: Sprite) -> dict[str, object]:
+    return sprite.manifest(reverse("sprite", args=[sprite.file_name]))
+
+
 # ─────────────────────────────
 # User session
 # ─────────────────────────────
+@room_not_required
 def user_login(req: GameRequest, ip_address: str) -> None:
     user = get_user_from_username(req.username)
     user.logged_in = True
-    user.save()
+    save_fields(user, "logged_in")
     logger.info("login", username=req.username, ip_address=ip_address)
     return None
 
 
+@room_not_required
 def user_logout(req: GameRequest, ip_address: str) -> None:
     user = get_user_from_username(req.username)
     user.logged_in = False
-    user.save()
+    save_fields(user, "logged_in")
     logger.info("logout", username=req.username, ip_address=ip_address)
     return None
 
 
+@room_not_required
 def get_user_status(req) -> dict:
     user = get_user_from_username(req.user_query)
+    last_activity = (
+        activity_buffer.last_activity(user.username) or user.last_activity
+    )
     last_activity_iso = None
-    if user.last_activity:
-        _logout_inactive_user(user)
-        last_activity_iso = _get_last_activity(user)
+    if last_activity:
+        _logout_inactive_user(user, last_activity)
+        last_activity_iso = _get_last_activity(last_activity)
 
     return {
         "logged_in": user.logged_in,
@@ -113,64 +130,64 @@ def get_user_status(req) -> dict:
 def new_board(req: GameRequest) -> dict[str, object]:
     """Return the context after a new board has been generated."""
     logger.info("new-board", board=req)
-    return get_new_board(req)
+    return board.get_new_board(req)
 
 
 def room_board(req: GameRequest) -> dict[str, object]:
-    logger.info("room-board", board=req.board)
-    return get_room_board(req)
+    logger.info("room-board", board_number=req.board_number)
+    return board.get_room_board(req)
 
 
 def restart_board(req: GameRequest) -> dict[str, object]:
     """Return the context for restart board."""
-    logger.info("restart-board", board=req.board)
-    return restart_board_context(req)
+    logger.info("restart-board", board_number=req.board_number)
+    return board.restart_board_context(req)
 
 
 def replay_board(req: GameRequest) -> dict[str, object]:
     """Return the context for replay board."""
-    logger.info("replay-board", board=req.board)
-    return replay_board_context(req)
+    logger.info("replay-board", board_number=req.board_number)
+    return cardplay.replay_board_context(req)
 
 
 def board_from_pbn(req: GameRequest):
     """Return board from a PBN string."""
-    return get_board_from_pbn(req)
+    return board.get_board_from_pbn(req)
 
 
 def get_history(req: GameRequest):
-    return get_history_boards_text(req)
+    return archive.get_history_boards_text(req)
 
 
 def save_board_file(req: GameRequest):
-    return save_boards_file_to_room(req)
+    return archive.save_boards_file_to_room(req)
 
 
 def get_archive_list(req: GameRequest):
-    return get_user_archive_list(req)
+    return archive.get_user_archive_list(req)
 
 
 def get_board_file(req: GameRequest):
-    return get_board_file_from_room(req)
+    return archive.get_board_file_from_room(req)
 
 
-def history_board(req) -> Board:
-    return get_history_board(req)
+def history_board(req) -> "Board":
+    return board.get_history_board(req)
 
 
 def rotate_boards(req: GameRequest) -> dict[str, object]:
-    return rotate_archived_boards(req)
+    return archive.rotate_archived_boards(req)
 
 
 # ─────────────────────────────
 # Bidding
 # ─────────────────────────────
 def bid_made(req: GameRequest) -> dict[str, str]:
-    return get_bid_made(req)
+    return bidding.get_bid_made(req)
 
 
 def use_bid(req: GameRequest, use_suggested_bid=True) -> dict[str, str]:
-    return get_bid_context(req, use_suggested_bid)
+    return bidding.get_bid_context(req, use_suggested_bid)
 
 
 # ─────────────────────────────
@@ -178,7 +195,7 @@ def use_bid(req: GameRequest, use_suggested_bid=True) -> dict[str, str]:
 # ─────────────────────────────
 def cardplay_setup(req: GameRequest) -> dict[str, object]:
     """Return the static context for cardplay."""
-    return get_cardplay_context(req)
+    return cardplay.get_cardplay_context(req)
 
 
 def card_played(req: GameRequest) -> dict[str, object]:
@@ -186,19 +203,19 @@ def card_played(req: GameRequest) -> dict[str, object]:
     Add a card to the current trick and increment current player.
     if necessary, complete the trick.
     """
-    return card_played_context(req)
+    return cardplay.card_played_context(req)
 
 
 def claim(req: GameRequest):
-    return claim_context(req)
+    return cardplay.claim_context(req)
 
 
 def compare_scores(req: GameRequest):
-    return compare_scores_context(req)
+    return cardplay.compare_scores_context(req)
 
 
 def undo(req: GameRequest):
-    return undo_context(req)
+    return board.undo_context(req)
 
 
 def get_user_set_hands(req: GameRequest):
@@ -214,7 +231,7 @@ def set_user_set_hands(req: GameRequest):
     room.set_hands = json.dumps(req.set_hands)
     room.use_set_hands = req.use_set_hands
     room.display_hand_type = req.display_hand_type
-    room.save()
+    save_fields(room, "set_hands", "use_set_hands", "display_hand_type")
     logger.info(
         "update-set-hands", username=req.username, set_hands=req.set_hands
     )
@@ -229,38 +246,67 @@ def package_versions():
     return versions
 
 
+@room_not_required
 def message_sent(req: GameRequest) -> None:
     logger.info("message-sent", username=req.username, message=req.message)
     return None
 
 
+@room_not_required
 def message_received(req: GameRequest) -> None:
     logger.info("message-received", username=req.username, message=req.message)
     return None
 
 
+@room_not_required
 def database_update(req: GameRequest) -> None:
     logger.info("database-update", username=req.username, payload=req.payload)
     return None
 
 
-def _logout_inactive_user(user: object) -> None:
-    time_diff = abs(timezone.now() - user.last_activity)
+def _logout_inactive_user(user: object, last_activity: datetime) -> None:
+    time_diff = abs(timezone.now() - last_activity)
     if time_diff > timedelta(hours=1):
         user.logged_in = False
-        user.save()
+        save_fields(user, "logged_in")
 
 
-def _get_last_activity(user: object) -> str:
+def _get_last_activity(last_activity: datetime) -> str:
     return (
-        user.last_activity.replace(
-            microsecond=(user.last_activity.microsecond // 1000) * 1000
+        last_activity.replace(
+            microsecond=(last_activity.microsecond // 1000) * 1000
         )  # milliseconds only
         .isoformat()
         .replace("+00:00", "Z")  # if it's UTC-aware
     )
 
 
+@room_not_required
 def seat_assigned(req: GameRequest) -> None:
     logger.info("seat-assigned", username=req.username, seat=req.seat)
     return None
+
+
+# Actions that can be combined in one /batch/ request, by endpoint name
+BATCH_ACTIONS = {
+    "get-user-set-hands": (get_user_set_hands, ()),
+    "set-user-set-hands": (set_user_set_hands, ()),
+    "new-board": (new_board, ()),
+    "restart-board": (restart_board, ()),
+    "replay-board": (replay_board, ()),
+    "room-board": (room_board, ()),
+    "pbn-board": (board_from_pbn, ()),
+    "use-history-board": (history_board, ()),
+    "get-history": (get_history, ()),
+    "rotate-boards": (rotate_boards, ()),
+    "bid-made": (bid_made, ()),
+    "use-suggestion": (use_bid, (True,)),
+    "use-own-bid": (use_bid, (False,)),
+    "cardplay": (cardplay_setup, ()),
+    "card-played": (card_played, ()),
+    "claim": (claim, ()),
+    "compare-scores": (compare_scores, ()),
+    "undo": (undo, ()),
+    "message-sent": (message_sent, ()),
+    "message-received": (message_received, ()),
+}
@@ -1,42 +1,123 @@
 """
     Archive functionality for Bfg.
 
-    The archive is a field in the room model.
-    It is a json encoded list of pbn strings.
+    Each board played in a room is an ArchivedBoard row holding its pbn.
+    Boards are listed newest first and a board's identifier is its position
+    in that list, so board k is read with one row from the (room, created)
+    index. get-history returns HISTORY_PAGE_SIZE boards at a time; the
+    response's next_cursor, sent back as history_cursor, continues after
+    the last board returned (keyset pagination, so deep pages cost no more
+    than the first).
+
+    Each row also holds the board's get-history entry, computed when it is
+    archived, so listing the history never parses a pbn. Rotating the
+    archive only changes Room.archive_rotation: a board is rotated by that
+    plus its own rotation when it is listed or restored.
 """
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+from django.db.models import Q, QuerySet
+
 from bridgeobjects import (SEATS, SUIT_NAMES, RANKS,
                            create_pbn_board, Call, Card,)
 from bfgbidding import Hand
 from bfgdealer import Board, Auction
 
-from common.models import Room
+from common.codec import CodecError, encode_board
+from common.models import ArchivedBoard, Room
+from common.unit_of_work import save_fields, save_new
 from common.utilities import GameRequest
-from common.constants import MAX_ARCHIVE
+from common.constants import HISTORY_PAGE_SIZE, PBN_CACHE_MAX_ENTRIES
+from config.logging import get_logger
+
+logger = get_logger(__name__)
 
 DATE_FORMAT = '%d %b %Y %H:%M:%S'
 
 
 def save_board_to_archive(room: Room, board: Board) -> None:
-    archive = json.loads(room.archive) if room.archive else []
     board.description = datetime.now().strftime(DATE_FORMAT)
-    archive.insert(0, get_pbn_string(board))
-    if len(archive) >= MAX_ARCHIVE:
-        archive = archive[:MAX_ARCHIVE]
-    room.archive = json.dumps(archive)
-    room.save()
+    save_new(ArchivedBoard(
+        room=room,
+        pbn=get_pbn_string(board),
+        summary=get_history_summary(board),
+        # Undo the room's rotation, which boards archived earlier carry
+        rotation=-room.archive_rotation % 4,
+    ))
+    _archive_changed(room)
+
+
+def _archive_changed(room: Room, *fields: str) -> None:
+    room.archive_version += 1
+    save_fields(room, 'archive_version', *fields)
+
+
+def get_history_summary(board: Board) -> dict[str, object]:
+    """Return the date and every hand by suit, as shown by get-history."""
+    return {
+        'date': board.description,
+        'hands': {
+            seat: _get_cards_by_suit(board.hands[seat]) for seat in SEATS},
+    }
 
 
-def get_history_boards_text(req: GameRequest) -> dict[str, dict[str, str]]:
+def get_history_boards_text(req: GameRequest) -> dict[str, object]:
+    room = req.room
+    (position, rows) = _get_archive_page(room, req.history_cursor)
     boards = []
-    raw_boards = []
-    raw_boards = _get_raw_archive_boards(req)
-    for index, board in enumerate(raw_boards):
-        board_dict = _get_history_board_dict(index, board)
-        boards.append(board_dict)
-    return {'boards': boards}
+    for index, row in enumerate(rows[:HISTORY_PAGE_SIZE]):
+        boards.append(_get_history_board_dict(
+            position + index, row.summary, _get_rotation(room, row)))
+    next_cursor = ''
+    if len(rows) > HISTORY_PAGE_SIZE:
+        next_cursor = _get_cursor(position + HISTORY_PAGE_SIZE,
+                                  rows[HISTORY_PAGE_SIZE - 1])
+    return {'boards': boards, 'next_cursor': next_cursor}
+
+
+def _archived_rows(room: Room) -> QuerySet:
+    """Return the room's archived boards, newest first."""
+    return ArchivedBoard.objects.filter(room=room).order_by('-created', '-id')
+
+
+def _get_archive_page(
+        room: Room, cursor: str) -> tuple[int, list[ArchivedBoard]]:
+    """
+    Return the position of the page and its rows, plus one if there are more.
+
+    A cursor is "position|created|id" of the last row of the previous page.
+    A cursor that cannot be read gives the first page.
+    """
+    rows = _archived_rows(room).only('summary', 'rotation', 'created')
+    position = 0
+    keys = _parse_cursor(cursor) if cursor else None
+    if keys:
+        (position, created, row_id) = keys
+        rows = rows.filter(
+            Q(created__lt=created) | Q(created=created, id__lt=row_id))
+    return (position, list(rows[:HISTORY_PAGE_SIZE + 1]))
+
+
+def _parse_cursor(cursor: str) -> tuple[int, datetime, int] | None:
+    """Return a cursor's position, created and id, or None if malformed."""
+    try:
+        (position, created, row_id) = cursor.split('|')
+        keys = (int(position), datetime.fromisoformat(created), int(row_id))
+    except ValueError:
+        logger.warning('bad history cursor', cursor=cursor)
+        return None
+    return keys
+
+
+def _get_cursor(position: int, row: ArchivedBoard) -> str:
+    return f'{position}|{row.created.isoformat()}|{row.pk}'
+
+
+def _get_rotation(room: Room, row: ArchivedBoard) -> int:
+    return (room.archive_rotation + row.rotation) % 4
 
 
 def save_boards_file_to_room(req):
@@ -47,7 +128,7 @@ def save_boards_file_to_room(req):
     }
     saved_boards.append(file)
     req.room.saved_boards = json.dumps(saved_boards)
-    req.room.save()
+    save_fields(req.room, 'saved_boards')
     return {'boards_saved': True}
 
 
@@ -63,29 +144,24 @@ def get_board_file_from_room(req):
     }
 
 
-def _get_raw_archive_boards(req: GameRequest) -> list[Board]:
-    archive = json.loads(req.room.archive) if req.room.archive else []
-    return _get_boards_from_pbn(archive)
-
-
-def _get_boards_from_pbn(archive) -> list[Board]:
-    boards = []
-    for archive_board in archive:
-        board = Board()
-        pbn_board = archive_board.split('\n')
-        board.parse_pbn_board(pbn_board)
-        boards.append(board)
-    return boards
+def _get_board_from_pbn(pbn: str) -> Board:
+    board = Board()
+    board.parse_pbn_board(pbn.split('\n'))
+    return board
 
 
-def _get_history_board_dict(index: int, board: Board) -> dict[str, str]:
+def _get_history_board_dict(
+        index: int,
+        summary: dict[str, object],
+        rotation: int) -> dict[str, object]:
     hands = {}
     for seat in 'NS':
-        hand = board.hands[seat]
-        hands[seat] = _get_cards_by_suit(hand)
+        # The hand that rotation moves into seat
+        source_seat = SEATS[(SEATS.index(seat) - rotation) % 4]
+        hands[seat] = summary['hands'][source_seat]
     return {
         'identifier': index + 1,
-        'date': board.description,
+        'date': summary['date'],
         'hands': hands,
     }
 
@@ -105,11 +181,64 @@ def _get__suit_cards_as_string(hand: Hand, suit: str) -> str:
 
 
 def get_pbn_string(board: Board) -> str:
-    """Return the pbn string in a suitable form for download."""
-    calls = [Call(bid) for bid in board.bid_history]
+    """
+    Return the pbn string in a suitable form for download.
+
+    Rendering takes about a millisecond and every context carries it, so
+    the text is kept per worker against the board's encoding: a board that
+    has not changed since its last context is not rendered again.
+    """
+    ensure_auction(board)
+    try:
+        state = encode_board(board)
+    except CodecError:
+        return create_pbn_board(board)
+    pbn = pbn_cache.get(state)
+    if pbn is None:
+        pbn = create_pbn_board(board)
+        pbn_cache.put(state, pbn)
+    return pbn
+
+
+def ensure_auction(board: Board) -> None:
+    """Give the board an Auction of its bid history if it has none."""
     if not board.auction.calls:
+        calls = [Call(bid) for bid in board.bid_history]
         board.auction = Auction(calls, board.dealer)
-    return create_pbn_board(board)
+
+
+class PbnCache:
+    """A bounded LRU cache of rendered pbns keyed on encoded boards."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, state: bytes) -> str | None:
+        with self._lock:
+            pbn = self._entries.get(state)
+            if pbn is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(state)
+            self.hits += 1
+            return pbn
+
+    def put(self, state: bytes, pbn: str) -> None:
+        with self._lock:
+            self._entries[state] = pbn
+            self._entries.move_to_end(state)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+pbn_cache = PbnCache(PBN_CACHE_MAX_ENTRIES)
 
 
 def get_board_from_archive(req: GameRequest) -> Board:
@@ -117,22 +246,23 @@ def get_board_from_archive(req: GameRequest) -> Board:
     archived_board_id = req.board_id
     if not archived_board_id or int(archived_board_id) == 0:
         archived_board_id = 1
-    boards = _get_raw_archive_boards(req)
-    board = boards[int(req.board_id) - 1]
+    position = int(archived_board_id) - 1
+    row = (_archived_rows(req.room).only('pbn', 'rotation')
+           [position:position + 1].get())
+    board = _get_board_from_pbn(row.pbn)
+    rotation = _get_rotation(req.room, row)
+    if rotation:
+        board = _rotate_board(board, rotation)
     board.identifier = req.board_id
     return board
 
 
 def rotate_archived_boards(req: GameRequest) -> dict[str, object]:
     """Rotate archive hands, placing N in the rotation_seat."""
-    boards = _get_raw_archive_boards(req)
+    room = req.room
     rotation_index = SEATS.index(req.rotation_seat)
-    for board in boards:
-        board = _rotate_board(board, rotation_index)
-
-    archive = _create_list_of_archive_boards(boards)
-    req.room.archive = json.dumps(archive)
-    req.room.save()
+    room.archive_rotation = (room.archive_rotation + rotation_index) % 4
+    _archive_changed(room, 'archive_rotation')
     return get_history_boards_text(req)
 
 
@@ -153,14 +283,6 @@ def _rotate_board_hands(board: Board, rotation_index: int) -> Board:
     return board
 
 
-def _create_list_of_archive_boards(boards: list[Board]) -> list[str]:
-    archive = []
-    for board in boards:
-        board_pbn = get_pbn_string(board)
-        archive.append(board_pbn)
-    return archive
-
-
 def _get_rotated_vulnerability(board: Board, rotation_index: int) -> str:
     if rotation_index % 2 == 1:
         if board.vulnerable == 'EW':
@@ -11,7 +11,6 @@ from bfgbidding import comment_xrefs
 from bfgdealer import Board
 from bridgeobjects import SEATS, Auction, Call, Contract
 
-from common.archive import get_pbn_string
 from common.bidding_box import BiddingBox
 from common.constants import (
     CONTRACT_BASE,
@@ -21,12 +20,16 @@ from common.constants import (
     Mode,
 )
 from common.contexts import get_board_context
+from common.metrics import ENGINE, measure
 from common.models import Room
+from common.unit_of_work import save_fields
 from common.utilities import (
     GameRequest,
     get_bidding_data,
+    load_board,
     merge_context,
     passed_out,
+    save_board,
     three_passes,
 )
 from config.logging import get_logger
@@ -52,7 +55,7 @@ def bid_made_duo(req: GameRequest) -> dict[str, object]:
     Updates bid history, determines declarer and contract, and updates the
     BiddingBox and board context.
     """
-    board = Board().from_json(req.room.board)
+    board = load_board(req.room)
 
     _handle_player_bid(req, board)
 
@@ -62,8 +65,7 @@ def bid_made_duo(req: GameRequest) -> dict[str, object]:
         (board.declarer, board.contract) = _get_declarer_contract(board)
 
     board.warning = req.bid if req.bid in WARNINGS else None
-    req.room.board = board.to_json()
-    req.room.save()
+    save_board(req.room, board)
 
     (bb_names, bb_extra_names) = BiddingBox().refresh(
         board.bid_history, add_warnings=True
@@ -79,7 +81,6 @@ def bid_made_duo(req: GameRequest) -> dict[str, object]:
         "passed_out": passed_out_,
         "bid_box_names": bb_names,
         "bid_box_extra_names": bb_extra_names,
-        "board_pbn": get_pbn_string(board),
         "contract_target": CONTRACT_BASE + board.contract.level,
         "bidding_params": bidding_params,
     }
@@ -94,15 +95,16 @@ def bid_made_solo(req: GameRequest) -> dict[str, object]:
     and strategy text.
     """
     room = req.room
-    board = Board().from_json(room.board)
+    board = load_board(room)
 
-    suggested_bid = board.players[req.seat].make_bid(False)
+    with measure(ENGINE):
+        suggested_bid = board.players[req.seat].make_bid(False)
     right_wrong = "right" if suggested_bid.name == req.bid else "wrong"
     (bid_comment, strategy_text) = _get_comment_and_strategy(suggested_bid)
 
     room.own_bid = req.bid
     room.suggested_bid = suggested_bid.name
-    room.save()
+    save_fields(room, "own_bid", "suggested_bid")
 
     state_context = get_board_context(req, board)
     bidding_params = get_bidding_data(board)
@@ -137,7 +139,8 @@ def _handle_player_bid(req: GameRequest, board: Board) -> None:
         return
 
     opp_seat = (SEATS.index(req.seat) + 1) % 4
-    board.players[opp_seat].make_bid()
+    with measure(ENGINE):
+        board.players[opp_seat].make_bid()
 
 
 def _get_declarer_contract(board: Board) -> tuple[str, Contract]:
@@ -190,7 +193,8 @@ def get_initial_auction(
         len(board.bid_history) + seat_diff
     ) % mod_value != initial_count and not three_passes(board.bid_history):
         player_index = (dealer_index + len(board.bid_history)) % 4
-        board.players[player_index].make_bid()
+        with measure(ENGINE):
+            board.players[player_index].make_bid()
     auction_calls = [Call(call) for call in board.bid_history]
     return Auction(auction_calls, board.dealer)
 
@@ -205,7 +209,8 @@ def get_auction(board: Board, bid_history=None) -> Auction:
     dealer_index = SEATS.index(board.dealer)
     while not three_passes(board.bid_history):
         player_index = (dealer_index + len(board.bid_history)) % 4
-        board.players[player_index].make_bid()
+        with measure(ENGINE):
+            board.players[player_index].make_bid()
     auction_calls = [Call(call) for call in board.bid_history]
     return Auction(auction_calls, board.dealer)
 
@@ -240,12 +245,11 @@ def get_bid_context(
     Updates bid history, board state, BiddingBox, and returns combined context.
     """
     room = req.room
-    board = Board().from_json(room.board)
+    board = load_board(room)
     bid = _update_bid_history(room, board, use_suggested_bid)
     logger.info("bid-made", call=bid, username=req.username, seat=req.seat)
     _update_board_other_bids(board, req)
-    room.board = board.to_json()
-    room.save()
+    save_board(room, board)
 
     (bb_names, bb_extra_names) = BiddingBox().refresh(
         board.bid_history, add_warnings=False
@@ -260,7 +264,6 @@ def get_bid_context(
         "bid_box_extra_names": bb_extra_names,
         "contract": board.contract.name,
         "declarer": board.declarer,
-        "board_pbn": get_pbn_string(board),
         "contract_target": CONTRACT_BASE + board.contract.level,
     }
     return merge_context(specific_context, **state_context)
@@ -286,7 +289,8 @@ def _update_board_other_bids(board: Board, req: GameRequest) -> None:
     seat_index = SEATS.index(req.seat)
     for other in range(3):
         other_seat = (seat_index + 1 + other) % 4
-        bid = board.players[other_seat].make_bid()
+        with measure(ENGINE):
+            bid = board.players[other_seat].make_bid()
         logger.info(
             "bid-made",
             call=bid.name,
@@ -30,11 +30,15 @@ from common.archive import get_board_from_archive, save_board_to_archive
 from common.bidding import get_initial_auction
 from common.constants import CONTRACT_BASE, SOURCES, Mode
 from common.contexts import get_board_context
+from common.double_dummy import precompute
+from common.metrics import ENGINE, measure
 from common.undo_cardplay import undo_cardplay
+from common.unit_of_work import save_fields
 from common.utilities import (
     GameRequest,
     get_current_player,
     get_unplayed_cards_for_board_hands,
+    load_board,
     merge_context,
     passed_out,
 )
@@ -53,11 +57,13 @@ def get_new_board(req: GameRequest) -> dict[str, object]:
     """
     room = req.room
     room.board_number += 1
+    save_fields(room, "board_number")
 
     board = _get_new_board(req)
     board.description = str(uuid.uuid1())
     board.vulnerable = VULNERABILITY[room.board_number % 16]
     board.dealer = SEATS[(room.board_number - 1) % 4]
+    precompute(board, req.room.pk)
     board.auction = get_initial_auction(req, board, [])
     save_board_to_archive(room, board)
 
@@ -90,7 +96,7 @@ def restart_board_context(req: GameRequest) -> dict:
     unplayed cards for all hands. Returns a dictionary representing the current
     board context.
     """
-    board = Board().from_json(req.room.board)
+    board = load_board(req.room)
     board.tricks = [Trick()]
     board.auction = Auction()
     board.auction = get_initial_auction(req, board, [])
@@ -134,7 +140,8 @@ def _get_set_hand(req: GameRequest) -> Board:
     set_hands = json.loads(room.set_hands)
 
     (dealer_engine, dealer) = _get_dealer_engine(req, room.board_number)
-    board = dealer_engine.get_set_hand(set_hands, dealer)
+    with measure(ENGINE):
+        board = dealer_engine.get_set_hand(set_hands, dealer)
     board.source = SOURCES["set-hands"]
     _set_board_hands(board)
     return board
@@ -172,7 +179,8 @@ def _get_random_board() -> Board:
     Uses DealerDuo for dealing and marks the board source as 'random'.
     """
     # Doesn't matter whether we use DealerSolo or DealerDuo
-    board = DealerDuo().deal_random_board()
+    with measure(ENGINE):
+        board = DealerDuo().deal_random_board()
     board.set_hand = None
     board.source = SOURCES["random"]
     _set_board_hands(board)
@@ -186,7 +194,7 @@ def get_room_board(req: GameRequest) -> dict[str, object]:
     Includes bid history, contract, tricks, stage, and other relevant state.
     """
     room = req.room
-    board = Board().from_json(room.board)
+    board = load_board(room)
 
     return _room_board_context(req, board)
 
@@ -252,6 +260,7 @@ def get_history_board(req: GameRequest) -> dict[str, object]:
     Restores bid history, auction, and logs the event.
     """
     board = get_board_from_archive(req)
+    precompute(board, req.room.pk)
 
     # board.display_stats()
 
@@ -275,6 +284,7 @@ def get_board_from_pbn(req: GameRequest) -> dict[str, object]:
         return {"error": "Invalid pbn string"}
 
     board.source = SOURCES["pbn"]
+    precompute(board, req.room.pk)
     get_unplayed_cards_for_board_hands(board)
     logger.info(
         "pbn-board", username=req.username, pbn=board.create_pbn_list()
@@ -287,7 +297,7 @@ def get_board_from_pbn(req: GameRequest) -> dict[str, object]:
 def _update_room_for_pbn(req: GameRequest) -> None:
     room = req.room
     room.saved_pbn = req.pbn_text
-    room.save()
+    save_fields(room, "saved_pbn")
 
 
 def _get_context_for_pbn_board(
@@ -309,7 +319,9 @@ def _trick_context_for_pbn_board(board: Board) -> dict[str, str]:
         board.tricks.append(trick)
     trick_context = _apply_initial_cards(board)
 
-    if suggested_card := next_card(board):
+    with measure(ENGINE):
+        suggested_card = next_card(board)
+    if suggested_card:
         trick_context["suggested_card"] = suggested_card.name
     return trick_context
 
@@ -430,7 +442,7 @@ def undo_context(req: GameRequest) -> dict[str, object]:
 
     Updates the auction, bid history, current player, and user activity.
     """
-    board = Board().from_json(req.room.board)
+    board = load_board(req.room)
 
     if board.contract.name:
         initial_state = _undo_card_play(req, board)
@@ -0,0 +1,132 @@
+"""
+In-process cache of deserialized boards.
+
+Rebuilding a Board from the game log (decode_board) is a large part of
+every bidding and cardplay request. Boards are cached per room and keyed on
+Room.board_version, which save_board increments whenever the board changes.
+Every request reads the room row, so a worker that holds an older version
+than the row simply misses and rebuilds from the row: workers never need to
+talk to each other to stay consistent.
+
+A board is taken out of the cache when it is loaded, because handlers mutate
+it, and is only put back by save_board once it has been serialised. A request
+that fails part way through therefore never leaves a half-mutated board in
+the cache.
+
+The cache is bounded both by the number of entries and by the total size of
+the boards' encoded state, which is used as a proxy for their memory
+footprint.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from common.constants import BOARD_CACHE_MAX_BYTES, BOARD_CACHE_MAX_ENTRIES
+
+if TYPE_CHECKING:
+    from bfgdealer import Board
+
+
+@dataclass(slots=True)
+class _Entry:
+    version: int
+    size: int
+    board: "Board"
+    # The encoded board, which save_board diffs the next state against
+    state: bytes = b""
+
+
+class BoardCache:
+    """A bounded LRU cache of live boards keyed on room id."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def take(self, room_id: int, version: int) -> "Board | None":
+        """Remove and return the board for room_id if it is at version."""
+        entry = self.take_entry(room_id, version)
+        return entry.board if entry is not None else None
+
+    def take_entry(self, room_id: int, version: int) -> _Entry | None:
+        """Remove and return the entry for room_id if it is at version."""
+        with self._lock:
+            entry = self._entries.pop(room_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        room_id: int,
+        version: int,
+        board: "Board",
+        size: int,
+        state: bytes = b"",
+    ) -> None:
+        """Store board for room_id, evicting the least recently used."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(room_id, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[room_id] = _Entry(version, size, board, state)
+            self._bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def invalidate(self, room_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(room_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+board_cache = BoardCache(BOARD_CACHE_MAX_ENTRIES, BOARD_CACHE_MAX_BYTES)
+
+
+def cache_board(
+    room_id: int, version: int, board: "Board", size: int, state: bytes
+) -> None:
+    """board_cache.put, as a function after_flush partials can pickle."""
+    board_cache.put(room_id, version, board, size, state)
+
+
+def link_players_to_hands(board: "Board") -> None:
+    """
+    Give every player its hand, as Board.from_json does.
+
+    Freshly dealt boards only link the players keyed by index, so a board
+    that has not been through json would fail on board.players['N'].
+    """
+    for key, hand in board.hands.items():
+        board.players[key].hand = hand
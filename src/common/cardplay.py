@@ -16,18 +16,20 @@ import structlog
 
 from bridgeobjects import SEATS, Card
 from bfgdealer import Board, Trick
-from bfgcardplay import next_card
 
 from common.utilities import (
-    passed_out, save_board, get_current_player, GameRequest, merge_context)
+    passed_out, save_board, get_current_player, GameRequest, merge_context,
+    load_board)
 from common.contexts import get_board_context
+from common.double_dummy import next_card
+from common.metrics import ENGINE, measure
 from common.board import update_trick_scores
 
 logger = structlog.get_logger()
 
 
 def _load_board(req: GameRequest) -> Board:
-    return Board().from_json(req.room.board)
+    return load_board(req.room)
 
 
 def _clone_board(board: Board) -> Board:
@@ -71,7 +73,8 @@ def _get_suggested_card_name(board: Board, req: GameRequest) -> str:
         return ''
 
     if not board.tricks[0].cards:
-        card = next_card(board, req.use_double_dummy)
+        with measure(ENGINE):
+            card = next_card(board, req.use_double_dummy)
         return card.name if card else ''
 
     return board.tricks[0].cards[0].name
@@ -197,7 +200,8 @@ def get_next_card(board: Board, req: GameRequest) -> str:
         logger.error('no-unplayed-cards', player=board.current_player,)
         return ''
 
-    card_to_play = next_card(board, req.use_double_dummy)
+    with measure(ENGINE):
+        card_to_play = next_card(board, req.use_double_dummy)
     if not card_to_play:
         return 'blank'
     return card_to_play.name
@@ -260,7 +264,8 @@ def _get_ns_target_tricks(board, req) -> int:
 def _auto_play_remaining_tricks(
         board: Board, use_double_dummy: bool = False) -> tuple[int, int]:
     while board.NS_tricks + board.EW_tricks < 13:
-        card = next_card(board, use_double_dummy)
+        with measure(ENGINE):
+            card = next_card(board, use_double_dummy)
         if not card:
             break
         _play_card_if_valid(board, card.name if card else '')
@@ -0,0 +1,368 @@
+"""
+Compact binary encoding of a Board, stored in the game log.
+
+Board.to_json writes every hand twice (by seat and by index), each as a
+nested json string, and recomputes the board's derived state before doing
+so; a board is about 3KB and takes milliseconds to write and read. This
+codec writes only what Board.from_json reads back:
+
+    magic (2 bytes) and CODEC_VERSION (1 byte)
+    the deal      4 x 52-bit masks of the cards, 4 more of the unplayed cards
+    the auction   bid history and auction calls as indices into CALLS
+    the play      every trick as leader, winner and card indices
+    scalars       seats as one byte, other fields as tagged values
+
+A card is its index in CARD_NAMES, so hands come back in that order rather
+than in the order they were dealt. The index-keyed hands share the seat's
+Hand, as boards in the board cache already do (see link_players_to_hands).
+
+read_outline reads just the deal, auction and cards played, which the game
+log (common.game_log) compares to name each change of state.
+
+Rooms not yet in the game log hold the encoding in Room.board_state, or json
+in Room.board; load_board still reads both and migration 0019 moves them
+into the log.
+"""
+
+import struct
+from dataclasses import dataclass
+
+from bridgeobjects import (
+    CALLS,
+    CARD_NAMES,
+    SEATS,
+    Auction,
+    Card,
+    Contract,
+    Trick,
+)
+
+from common.lazy import LazyModule
+
+dealer = LazyModule("bfgdealer")
+
+MAGIC = b"BG"
+CODEC_VERSION = 1
+
+# Seat codes: SEATS indices, then these for the other values a seat can hold
+NO_SEAT = {"": 4, None: 5}
+SEAT_CODES = {**{seat: index for index, seat in enumerate(SEATS)}, **NO_SEAT}
+SEAT_VALUES = [*SEATS, "", None]
+
+# Tags of scalar values
+(NONE, FALSE, TRUE, SMALL_INT, INT, STRING) = range(6)
+
+# A call that is not in CALLS is written as this, followed by its name
+CALL_ESCAPE = 255
+
+CARD_INDEX = {name: index for index, name in enumerate(CARD_NAMES)}
+CALL_INDEX = {name: index for index, name in enumerate(CALLS)}
+
+# The header and the hands' card masks have the same size in every encoding
+FIXED_SIZE = 4 + len(SEATS) * 2 * 7
+
+# Bit flags of the header
+INDEX_KEYED_HANDS = 1
+HAS_MAKEABLE_TRICKS = 2
+
+
+class CodecError(ValueError):
+    """Raised when bytes are not a board written by this codec."""
+
+
+@dataclass(frozen=True, slots=True)
+class Outline:
+    """What a board's play has reached, read without building the Board."""
+    deal: bytes
+    bid_history: list[str]
+    cards: list[str]  # Every card played, in order
+    tricks_taken: int
+
+
+def is_encoded(data: bytes | memoryview | str | None) -> bool:
+    return isinstance(data, (bytes, memoryview)) and bytes(data[:2]) == MAGIC
+
+
+def encode_board(board: "dealer.Board") -> bytes:
+    """Return the compact encoding of board."""
+    out = bytearray(MAGIC)
+    out.append(CODEC_VERSION)
+    flags = 0
+    if 0 in board.hands:
+        flags |= INDEX_KEYED_HANDS
+    if board._makeable_tricks is not None:
+        flags |= HAS_MAKEABLE_TRICKS
+    out.append(flags)
+
+    for seat in SEATS:
+        hand = board.hands[seat]
+        out += _card_mask(hand.cards)
+        out += _card_mask(hand.unplayed_cards)
+
+    _write_calls(out, board.bid_history)
+    _write_calls(out, [call.name for call in board._auction.calls])
+    _write_seat(out, board._auction.first_caller)
+    _write_value(out, board._contract.name)
+    _write_seat(out, board._contract.declarer)
+
+    out.append(len(board.tricks))
+    for trick in [*board.tricks, board.current_trick]:
+        _write_seat(out, trick.leader)
+        _write_seat(out, trick.winner)
+        out.append(len(trick.cards))
+        out += bytes(CARD_INDEX[card.name] for card in trick.cards)
+
+    for seat in (board.current_player, board.declarer, board.dealer):
+        _write_seat(out, seat)
+    for value in (
+        board.warning,
+        board.declarer_index,
+        board.declarers_tricks,
+        board.dealer_index,
+        board.description,
+        board.north,
+        board.east,
+        board.south,
+        board.west,
+        board.NS_tricks,
+        board.EW_tricks,
+        board._stage,
+        board.source,
+        board.vulnerable,
+        board.identifier,
+    ):
+        _write_value(out, value)
+
+    if flags & HAS_MAKEABLE_TRICKS:
+        for seat in SEATS:
+            levels = board._makeable_tricks[seat]
+            out.append(len(levels))
+            for level in levels:
+                _write_value(out, level)
+    return bytes(out)
+
+
+def decode_board(data: bytes | memoryview) -> "dealer.Board":
+    """Return the Board that encode_board wrote as data."""
+    reader = _Reader(bytes(data))
+    flags = _read_header(reader)
+
+    cards = [Card(name) for name in CARD_NAMES]
+    board = dealer.Board()
+    hands = {}
+    for index, seat in enumerate(SEATS):
+        # Board() has already made an empty Hand for each seat
+        hand = board.hands[seat]
+        hand.cards = _cards_from_mask(reader.take(7), cards)
+        hand.unplayed_cards = _cards_from_mask(reader.take(7), cards)
+        hands[seat] = hand
+        board.players[seat].hand = hand
+        if flags & INDEX_KEYED_HANDS:
+            hands[index] = hand
+            board.players[index].hand = hand
+
+    bid_history = _read_calls(reader)
+    board._auction = Auction(_read_calls(reader), reader.seat())
+    board.bid_history = bid_history
+    contract_name = reader.value()
+    if contract_name == "None":
+        contract_name = None
+    board._contract = Contract(contract_name, reader.seat())
+
+    trick_count = reader.byte()
+    tricks = []
+    for _ in range(trick_count + 1):
+        trick = Trick()
+        trick.leader = reader.seat()
+        trick.winner = reader.seat()
+        trick.cards = [cards[index] for index in reader.take(reader.byte())]
+        tricks.append(trick)
+
+    # The same assignments, in the same order, as Board.from_json
+    (current_player, declarer, dealer_seat) = (
+        reader.seat(),
+        reader.seat(),
+        reader.seat(),
+    )
+    (
+        board.warning,
+        declarer_index,
+        declarers_tricks,
+        dealer_index,
+        board.description,
+        north,
+        east,
+        south,
+        west,
+        ns_tricks,
+        ew_tricks,
+        stage,
+        source,
+        vulnerable,
+        identifier,
+    ) = (reader.value() for _ in range(15))
+    board.current_player = current_player
+    board.declarer = declarer
+    board.declarer_index = declarer_index
+    board.declarers_tricks = declarers_tricks
+    board.dealer = dealer_seat
+    board.dealer_index = dealer_index
+    board.east = east
+    board.EW_tricks = ew_tricks
+    board.hands = hands
+    board.north = north
+    board.NS_tricks = ns_tricks
+    board.south = south
+    board._stage = stage
+    board.source = source
+    board.vulnerable = vulnerable
+    board.west = west
+    board.identifier = 0 if identifier == "" else identifier
+    board.tricks = tricks[:-1]
+    board.current_trick = tricks[-1]
+    board.initialise_tricks()
+
+    board._makeable_tricks = None
+    if flags & HAS_MAKEABLE_TRICKS:
+        board._makeable_tricks = {
+            seat: [reader.value() for _ in range(reader.byte())]
+            for seat in SEATS
+        }
+    return board
+
+
+def read_outline(data: bytes | memoryview) -> Outline:
+    """Return the deal, auction and play of an encoded board."""
+    reader = _Reader(bytes(data))
+    _read_header(reader)
+    deal = bytearray()
+    for _ in SEATS:
+        deal += reader.take(7)
+        reader.take(7)
+    bid_history = _read_calls(reader)
+    # The auction's calls and first seat, the contract and its declarer
+    _read_calls(reader)
+    reader.seat()
+    reader.value()
+    reader.seat()
+
+    cards = []
+    for _ in range(reader.byte() + 1):
+        reader.seat()  # leader
+        reader.seat()  # winner
+        cards.extend(CARD_NAMES[index] for index in reader.take(reader.byte()))
+
+    for _ in range(3):
+        reader.seat()
+    values = [reader.value() for _ in range(15)]
+    # NS_tricks and EW_tricks, in the order encode_board writes them
+    tricks_taken = (values[9] or 0) + (values[10] or 0)
+    return Outline(bytes(deal), bid_history, cards, tricks_taken)
+
+
+def _read_header(reader: "_Reader") -> int:
+    """Check the magic and version and return the flags."""
+    if reader.take(2) != MAGIC:
+        raise CodecError("Not an encoded board")
+    version = reader.byte()
+    if version != CODEC_VERSION:
+        raise CodecError(f"Unsupported board codec version {version}")
+    return reader.byte()
+
+
+def _card_mask(cards: list[Card]) -> bytes:
+    mask = 0
+    for card in cards:
+        mask |= 1 << CARD_INDEX[card.name]
+    return mask.to_bytes(7, "big")
+
+
+def _cards_from_mask(data: bytes, cards: list[Card]) -> list[Card]:
+    mask = int.from_bytes(data, "big")
+    return [card for index, card in enumerate(cards) if mask >> index & 1]
+
+
+def _write_calls(out: bytearray, calls: list[str]) -> None:
+    out.append(len(calls))
+    for call in calls:
+        index = CALL_INDEX.get(call)
+        if index is None:
+            out.append(CALL_ESCAPE)
+            _write_value(out, call)
+        else:
+            out.append(index)
+
+
+def _write_seat(out: bytearray, seat: str | None) -> None:
+    code = SEAT_CODES.get(seat)
+    if code is None:
+        raise CodecError(f"Invalid seat {seat!r}")
+    out.append(code)
+
+
+def _write_value(out: bytearray, value: object) -> None:
+    if value is None:
+        out.append(NONE)
+    elif value is False:
+        out.append(FALSE)
+    elif value is True:
+        out.append(TRUE)
+    elif isinstance(value, int) and -128 <= value < 128:
+        out.append(SMALL_INT)
+        out += struct.pack(">b", value)
+    elif isinstance(value, int):
+        out.append(INT)
+        out += struct.pack(">q", value)
+    elif isinstance(value, str):
+        encoded = value.encode()
+        out.append(STRING)
+        out += struct.pack(">H", len(encoded))
+        out += encoded
+    else:
+        raise CodecError(f"Cannot encode {type(value).__name__} {value!r}")
+
+
+class _Reader:
+    __slots__ = ("data", "position")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.position = 0
+
+    def take(self, size: int) -> bytes:
+        start = self.position
+        self.position += size
+        if self.position > len(self.data):
+            raise CodecError("Encoded board is truncated")
+        return self.data[start:self.position]
+
+    def byte(self) -> int:
+        return self.take(1)[0]
+
+    def seat(self) -> str | None:
+        return SEAT_VALUES[self.byte()]
+
+    def value(self) -> object:
+        tag = self.byte()
+        if tag == NONE:
+            return None
+        if tag == FALSE:
+            return False
+        if tag == TRUE:
+            return True
+        if tag == SMALL_INT:
+            return struct.unpack(">b", self.take(1))[0]
+        if tag == INT:
+            return struct.unpack(">q", self.take(8))[0]
+        if tag == STRING:
+            (length,) = struct.unpack(">H", self.take(2))
+            return self.take(length).decode()
+        raise CodecError(f"Unknown value tag {tag}")
+
+
+def _read_calls(reader: _Reader) -> list[str]:
+    calls = []
+    for _ in range(reader.byte()):
+        index = reader.byte()
+        calls.append(reader.value() if index == CALL_ESCAPE else CALLS[index])
+    return calls
@@ -8,7 +8,45 @@ from enum import auto
 DEFAULT_SUIT_ORDER = ['S', 'H', 'C', 'D']
 
 MAXIMUM_BIDS_ALLOWED_FOR = 24
-MAX_ARCHIVE = 25
+# Archived boards returned by one get-history request
+HISTORY_PAGE_SIZE = 25
+
+# Live boards held per worker (see common.board_cache)
+BOARD_CACHE_MAX_ENTRIES = 512
+# Encoded boards are about a tenth the size of their json
+BOARD_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# Board contexts kept per worker for delta responses (see common.snapshots)
+SNAPSHOT_MAX_ROOMS = 512
+SNAPSHOT_VERSIONS_PER_ROOM = 4
+
+# Rendered pbns kept per worker, by encoded board (see common.archive)
+PBN_CACHE_MAX_ENTRIES = 1024
+
+# Threads solving double dummy tables, and tables kept per worker by deal
+# (see common.double_dummy)
+DD_TABLE_WORKERS = 1
+DD_TABLES_MAX_ENTRIES = 1024
+# Solved cardplay positions kept per worker, shared by every room
+DD_SOLUTIONS_MAX_ENTRIES = 4096
+# Longest a suggested card waits for the solver before the engine's is used
+DD_POSITION_WAIT_SECONDS = 0.05
+
+# Game events between full copies of the board (see common.game_log)
+GAME_SNAPSHOT_EVERY = 16
+
+# Browser cache lifetime of the static-data response (revalidated by ETag)
+STATIC_DATA_MAX_AGE = 24 * 60 * 60
+
+# Sprite sheet urls are content-hashed, so browsers may keep them for a year
+SPRITE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Times a request is run when partners write its room at the same time,
+# before it is answered 409 (see common.unit_of_work)
+ROOM_WRITE_ATTEMPTS = 3
+
+# Interval between writes of buffered user activity (see common.activity)
+ACTIVITY_FLUSH_SECONDS = 5
 
 YOUR_SELECTION_TEXT = 'Your selection:'
 SUGGEST_BID_TEXT = 'Suggested bid:'
@@ -1,23 +1,63 @@
-from bridgeobjects import SUITS, SEATS, Hand
+import copy
+from functools import cache, cached_property, partial
+
+from bridgeobjects import CARD_NAMES, SEATS, Card, Hand
 from bfgdealer import Board
 from common.bidding_box import BiddingBox
 
-from common.archive import get_pbn_string
+from common.archive import ensure_auction, get_pbn_string
 from common.constants import DEFAULT_SUIT_ORDER, Mode
+from common import double_dummy
+from common.metrics import CONTEXT, timed
+from common.models import Room
+from common.snapshots import context_delta, snapshot_cache, store_snapshot
+from common.unit_of_work import after_flush
 from common.utilities import (
     save_board, three_passes, passed_out, get_bidding_data)
 
+SUIT_NAMES = ('S', 'H', 'D', 'C')
+
 
 def get_board_context(req, board) -> dict[str, str]:
+    """
+    Save the board and return its context.
+
+    If the request gives a since_version this worker still holds, only the
+    keys that changed since then are returned (see common.snapshots).
+    """
     context = _board_context(req, board)
     save_board(req.room, board)
+    version = req.room.board_version
+    # Kept once the room is written, in case a partner's request wins
+    after_flush(partial(store_snapshot, req.room.pk, version,
+                        req.mode, copy.deepcopy(context)))
+
+    delta = None
+    if req.since_version:
+        old = snapshot_cache.get(req.room.pk, req.since_version, req.mode)
+        if old is not None:
+            delta = context_delta(old, context)
+    if delta is not None:
+        context = delta
+    context['state_version'] = version
+    context['delta'] = delta is not None
     return context
 
 
+@timed(CONTEXT)
 def _board_context(req, board) -> dict[str, str]:
-    bb_context = _get_bb_context(req.mode, board)
-    board_context = _get_board_context(board, req.room)
-    return {**board_context, **bb_context}
+    """Return the keys of the board's context that the request asks for."""
+    # The trick context cannot be set here (see card_played))
+    # Rendering the pbn fills in the auction, which the board is saved with
+    ensure_auction(board)
+    view = BoardView(board, req.room)
+    context = {
+        key: value(view) for key, value in CONTEXT_KEYS.items()
+        if req.wants(key)
+    }
+    if req.wants('bid_box_names') or req.wants('bid_box_extra_names'):
+        context.update(_get_bb_context(req.mode, board))
+    return context
 
 
 def _get_bb_context(mode: str, board: Board) -> dict[str, str]:
@@ -30,59 +70,133 @@ def _get_bb_context(mode: str, board: Board) -> dict[str, str]:
     }
 
 
-def _get_board_context(board: Board, room: int) -> dict[str, object]:
-    """Return a context with the current state of the board."""
-    # The trick context cannot be set here (see card_played))
-    suit_order = _get_suit_order(board)
-    trick_suit = ''
-    if board.tricks and board.tricks[-1].suit:
-        trick_suit = board.tricks[-1].suit.name
-    bidding_params = get_bidding_data(board)
-    return {
-        'dealer': board.dealer,
-        'bid_history': board.bid_history,
-        'bidding_params': bidding_params,
-        'description': board.description,
-        'can_double': False,
-        'can_redouble': False,
-        'board_number': room.board_number,
-        'vulnerable': board.vulnerable,
-        'suit_order': suit_order,
-        'hand_cards': _sort_hand_cards(board),
-        'unplayed_card_names': _unplayed_card_names(board),
-        'max_suit_length': _max_suit_length(board),
-        'hand_suit_length': _hand_suit_length(board),
-        'current_player': board.current_player,
-        'previous_player': _get_previous_player(board),
-        'tricks': [
-            [card.name for card in trick.cards] for trick in board.tricks
-        ],
-        'tricks_leaders': [trick.leader for trick in board.tricks],
-        'trick_count': len(board.tricks),
-        'trick_cards': [card.name for card in board.tricks[-1].cards],
-        'trick_suit': trick_suit,
-        'ns_tricks': board.NS_tricks,
-        'ew_tricks': board.EW_tricks,
-        'score': _get_score(board),
-        'dummy': _get_dummy_seat(board),
-        'board_pbn': get_pbn_string(board),
-        'three_passes': three_passes(board.bid_history),
-        'passed_out': passed_out(board.bid_history),
-        'contract': board.contract.name,
-        'contract_target': 6 + board.contract.level,
-        'makeable_tricks': board.makeable_tricks,
-        'declarer': board.declarer,
-        'stage': board.stage,
-        'source': board.source,
-        'identifier': board.identifier,
-        'test': False,
-        'saved_pbn': room.saved_pbn,
-    }
+class BoardView:
+    """
+    The facts about a board that its context is built from.
+
+    Each is worked out once, when first asked for: the auction is looked
+    at once for the suit order, and each hand's unplayed cards are counted
+    by suit once rather than wrapped in a new Hand for every key that
+    needs a shape. Facts that no requested key needs are never worked out.
+    """
+
+    def __init__(self, board: Board, room: Room) -> None:
+        self.board = board
+        self.room = room
 
+    @cached_property
+    def three_passes(self) -> bool:
+        return three_passes(self.board.bid_history)
 
-def _get_suit_order(board: Board) -> list[str]:
+    @cached_property
+    def passed_out(self) -> bool:
+        return passed_out(self.board.bid_history)
+
+    @cached_property
+    def suit_order(self) -> list[str]:
+        return _get_suit_order(self.board, self.three_passes)
+
+    @cached_property
+    def hand_cards(self) -> list[list[str]]:
+        position = _card_positions(tuple(self.suit_order))
+        return [
+            _sorted_names(self.board.hands[index].cards, position)
+            for index in range(4)
+        ]
+
+    @cached_property
+    def unplayed_card_names(self) -> dict[str, list[str]]:
+        position = _card_positions(tuple(self.suit_order))
+        return {
+            seat: _sorted_names(self.board.hands[seat].unplayed_cards,
+                                position)
+            for seat in SEATS
+        }
+
+    @cached_property
+    def suit_lengths(self) -> dict[str, dict[str, int]]:
+        """Return each seat's unplayed cards counted by suit."""
+        suit_lengths = {}
+        for seat in SEATS:
+            lengths = dict.fromkeys(SUIT_NAMES, 0)
+            for card in self.board.hands[seat].unplayed_cards:
+                lengths[card.suit.name] += 1
+            suit_lengths[seat] = lengths
+        return suit_lengths
+
+    @cached_property
+    def max_suit_length(self) -> dict[str, int]:
+        return {
+            seat: max(lengths.values())
+            for seat, lengths in self.suit_lengths.items()
+        }
+
+    @cached_property
+    def hand_suit_length(self) -> dict[str, list[int]]:
+        return {
+            seat: [lengths[suit] for suit in self.suit_order]
+            for seat, lengths in self.suit_lengths.items()
+        }
+
+    @cached_property
+    def trick_suit(self) -> str:
+        tricks = self.board.tricks
+        if tricks and tricks[-1].suit:
+            return tricks[-1].suit.name
+        return ''
+
+
+# How each key of a board context is worked out, in the order sent
+CONTEXT_KEYS = {
+    'dealer': lambda view: view.board.dealer,
+    'bid_history': lambda view: view.board.bid_history,
+    'bidding_params': lambda view: get_bidding_data(view.board),
+    'description': lambda view: view.board.description,
+    'can_double': lambda view: False,
+    'can_redouble': lambda view: False,
+    'board_number': lambda view: view.room.board_number,
+    'vulnerable': lambda view: view.board.vulnerable,
+    'suit_order': lambda view: view.suit_order,
+    'hand_cards': lambda view: view.hand_cards,
+    'unplayed_card_names': lambda view: view.unplayed_card_names,
+    'max_suit_length': lambda view: view.max_suit_length,
+    'hand_suit_length': lambda view: view.hand_suit_length,
+    'current_player': lambda view: view.board.current_player,
+    'previous_player': lambda view: _get_previous_player(view.board),
+    'tricks': lambda view: [
+        [card.name for card in trick.cards] for trick in view.board.tricks
+    ],
+    'tricks_leaders': lambda view: [
+        trick.leader for trick in view.board.tricks
+    ],
+    'trick_count': lambda view: len(view.board.tricks),
+    'trick_cards': lambda view: [
+        card.name for card in view.board.tricks[-1].cards
+    ],
+    'trick_suit': lambda view: view.trick_suit,
+    'ns_tricks': lambda view: view.board.NS_tricks,
+    'ew_tricks': lambda view: view.board.EW_tricks,
+    'score': lambda view: _get_score(view.board),
+    'dummy': lambda view: _get_dummy_seat(view.board),
+    'board_pbn': lambda view: get_pbn_string(view.board),
+    'three_passes': lambda view: view.three_passes,
+    'passed_out': lambda view: view.passed_out,
+    'contract': lambda view: view.board.contract.name,
+    'contract_target': lambda view: 6 + view.board.contract.level,
+    'makeable_tricks': lambda view: double_dummy.makeable_tricks(
+        view.board, view.room.pk),
+    'declarer': lambda view: view.board.declarer,
+    'stage': lambda view: view.board.stage,
+    'source': lambda view: view.board.source,
+    'identifier': lambda view: view.board.identifier,
+    'test': lambda view: False,
+    'saved_pbn': lambda view: view.room.saved_pbn,
+}
+
+
+def _get_suit_order(board: Board, three_passes: bool) -> list[str]:
     """Return a list of suit order."""
-    if not three_passes(board.bid_history):
+    if not three_passes:
         return DEFAULT_SUIT_ORDER
 
     bid_history = board.bid_history[:-3]
@@ -103,51 +217,17 @@ def _get_suit_order(board: Board) -> list[str]:
         return ['C', 'H', 'S', 'D']
 
 
-def _sort_hand_cards(board: Board) -> list[str]:
-    hands = []
-    hand_cards = []
-    suit_order = _get_suit_order(board)
-    for index in range(4):
-        hand = str(board.hands[index])
-        new_hand = hand.replace('Hand(', '').replace(')', '')
-        hands.append(new_hand.replace('"', ''))
-        sorted_hand = Hand.sort_card_list(board.hands[index].cards, suit_order)
-        hand_cards.append([card.name for card in sorted_hand])
-    return hand_cards
-
-
-def _unplayed_card_names(board: Board) -> dict[str, str]:
-    unplayed_card_names = {}
-    suit_order = _get_suit_order(board)
-    for seat in SEATS:
-        hand = board.hands[seat]
-        hand_for_shape = Hand(hand.unplayed_cards)
-        hand_for_shape.cards = list(hand.unplayed_cards)
-        unplayed = Hand.sort_card_list(hand_for_shape.cards, suit_order)
-        unplayed_card_names[seat] = [card.name for card in unplayed]
-    return unplayed_card_names
-
-
-def _max_suit_length(board: Board) -> dict[str, int]:
-    max_suit_length = {}
-    for seat in SEATS:
-        hand = board.hands[seat]
-        hand_for_shape = Hand(hand.unplayed_cards)
-        hand_for_shape.cards = list(hand.unplayed_cards)
-        max_suit_length[seat] = hand_for_shape.shape[0]
-    return max_suit_length
-
-
-def _hand_suit_length(board: Board) -> dict[str, int]:
-    hand_suit_length = {}
-    suits = _suits_by_order(board)
-    for seat in SEATS:
-        hand = board.hands[seat]
-        hand_for_shape = Hand(hand.unplayed_cards)
-        hand_for_shape.cards = list(hand.unplayed_cards)
-        hand_suit_length[seat] = [hand_for_shape.suit_length(suit)
-                                  for suit in suits]
-    return hand_suit_length
+@cache
+def _card_positions(suit_order: tuple[str, ...]) -> dict[str, int]:
+    """Return each card's place in a hand shown in suit_order."""
+    deck = [Card(name) for name in CARD_NAMES]
+    cards = Hand.sort_card_list(deck, list(suit_order))
+    return {card.name: index for index, card in enumerate(cards)}
+
+
+def _sorted_names(cards: list, position: dict[str, int]) -> list[str]:
+    """Return the names of cards in the order Hand.sort_card_list gives."""
+    return sorted((card.name for card in cards), key=position.__getitem__)
 
 
 def _get_previous_player(board: Board) -> str:
@@ -180,11 +260,6 @@ def _get_dummy_seat(board: Board) -> str | None:
     return SEATS[dummy_index]
 
 
-def _suits_by_order(board: Board) -> list[str]:
-    suit_order = _get_suit_order(board)
-    return [SUITS[suit_name] for suit_name in suit_order]
-
-
 def _calculate_score(board: Board) -> int:
     """Return the score for the board."""
     vulnerable = False
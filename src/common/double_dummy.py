@@ -0,0 +1,304 @@
+"""
+Double dummy tables, worked out in the background when a board is dealt.
+
+A board's makeable_tricks (the tricks each seat can take in each strain)
+comes from the double dummy solver, which takes most of a second per deal.
+Rather than have the first context of a board wait for it, get_new_board,
+get_board_from_pbn and get_history_board call precompute(board), which
+queues the deal on a small thread pool and returns at once. The solver runs
+in C and does not hold the GIL while it works, so requests carry on beside
+it.
+
+Tables are kept by deal ("<dealer>:<pbn hands>"), not by room: in memory,
+and in DoubleDummyTable so that every worker, and every room that deals or
+loads the same hands, finds them. makeable_tricks(board, room) is what the
+board context sends:
+
+    the board's own table, if it has one (saved with the board)
+    else the deal's stored table, once ready
+    else None, queuing the deal if it is not already queued
+
+A stored table is not put on the board, so reading a context never writes
+the room. Instead the worker bumps Room.dd_version of every room that
+queued the deal, which changes the room's ETag (see room_state_etag):
+clients polling room-board get the table on their next request.
+
+The same solver picks the suggested card when a request sets
+use_double_dummy (bfgcardplay's next_card takes the flag but ignores it).
+next_card(board, use_double_dummy) solves the position for the player on
+move and keeps the engine's card if no other card takes more tricks, else
+plays the first card that does. Solutions are held in a transposition
+cache keyed on the position: the cards left in each hand, the trump, the
+trick's leader and the cards already in the trick. Positions do not depend
+on the room or the order in which earlier tricks were played, so rooms
+playing the same deal share them. The opening lead is always the engine's.
+
+DDS is not safe to call from two threads at once (solve_board always uses
+its thread 0), so both kinds of solve take turns on one lock. A table holds
+it for most of a second, a position for a few milliseconds. The table
+workers wait for it; a position waits at most DD_POSITION_WAIT_SECONDS, and
+if the lock is still busy (a table, or another room's claim) the engine's
+card is played and nothing is cached. A claim of the whole hand takes the
+lock once per card, so other rooms' cards get in between.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from django.db import connection
+from django.db.models import F
+
+from common.constants import (
+    DD_POSITION_WAIT_SECONDS,
+    DD_SOLUTIONS_MAX_ENTRIES,
+    DD_TABLE_WORKERS,
+    DD_TABLES_MAX_ENTRIES,
+)
+from common.lazy import LazyModule
+from config.logging import get_logger
+
+if TYPE_CHECKING:
+    from bfgdealer import Board
+    from bridgeobjects import Card
+
+# Tables can be read without the app registry (see tests/test_double_dummy)
+models = LazyModule("common.models")
+# The views import this module for its counters, before any engine is used
+cardplay = LazyModule("bfgcardplay")
+bridgeobjects = LazyModule("bridgeobjects")
+dds = LazyModule("endplay.dds")
+endplay_types = LazyModule("endplay.types")
+
+logger = get_logger(__name__)
+
+Table = dict[str, list[str]]
+# Tricks the side on move takes after each card it can play, by card name
+Solution = dict[str, int]
+Position = tuple[str, str, tuple[str, ...], tuple[frozenset[str], ...]]
+
+_solver_lock = threading.Lock()
+
+
+class DoubleDummyTables:
+    """Tables by deal, solved on a thread pool and stored once."""
+
+    def __init__(self, workers: int, max_entries: int) -> None:
+        self.workers = workers
+        self.max_entries = max_entries
+        self._tables: OrderedDict[str, Table] = OrderedDict()
+        self._pending: set[str] = set()
+        # Rooms to bump when each pending deal's table is stored
+        self._rooms: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def precompute(self, board: "Board", room_id: int | None = None) -> None:
+        """Queue the board's table, unless it is known or already queued."""
+        if board._makeable_tricks:
+            return
+        deal = deal_key(board)
+        with self._lock:
+            if deal in self._tables:
+                return
+            if room_id is not None:
+                self._rooms.setdefault(deal, set()).add(room_id)
+            if deal in self._pending:
+                return
+            self._pending.add(deal)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="dd-table"
+                )
+        self._executor.submit(self._run, deal)
+
+    def get(self, board: "Board") -> Table | None:
+        """Return the board's table if it has been solved, else None."""
+        deal = deal_key(board)
+        with self._lock:
+            table = self._tables.get(deal)
+            if table is not None:
+                self._tables.move_to_end(deal)
+                return table
+            if deal in self._pending:
+                return None
+        table = (
+            models.DoubleDummyTable.objects.filter(deal=deal)
+            .values_list("table", flat=True)
+            .first()
+        )
+        if table is not None:
+            self._put(deal, table)
+        return table
+
+    def _run(self, deal: str) -> None:
+        try:
+            self._store(deal)
+        except Exception:
+            logger.exception("dd-table failed", deal=deal)
+        finally:
+            with self._lock:
+                self._pending.discard(deal)
+                self._rooms.pop(deal, None)
+            connection.close()
+
+    def _store(self, deal: str) -> None:
+        table = solve(deal)
+        self._put(deal, table)
+        models.DoubleDummyTable.objects.bulk_create(
+            [models.DoubleDummyTable(deal=deal, table=table)],
+            ignore_conflicts=True,
+        )
+        # Rooms that queue the deal from now on find the table in memory
+        with self._lock:
+            rooms = self._rooms.pop(deal, set())
+        models.Room.objects.filter(pk__in=rooms).update(
+            dd_version=F("dd_version") + 1
+        )
+
+    def _put(self, deal: str, table: Table) -> None:
+        with self._lock:
+            self._tables[deal] = table
+            self._tables.move_to_end(deal)
+            while len(self._tables) > self.max_entries:
+                self._tables.popitem(last=False)
+
+
+def deal_key(board: "Board") -> str:
+    """Return the deal as the solver reads it, as Board.makeable_tricks."""
+    return f"{board.dealer}:{board.get_deal_hands_pbn()}"
+
+
+def solve(deal: str) -> Table:
+    """Return the makeable tricks of deal, in Board.makeable_tricks' form."""
+    with _solver_lock:
+        makeable = str(dds.calc_dd_table(endplay_types.Deal(deal)))
+    return {seat[0]: seat[2:].split(",") for seat in makeable.split(";")[1:]}
+
+
+def makeable_tricks(board: "Board", room_id: int | None) -> Table | None:
+    """Return the board's table if it is ready, queuing it if not."""
+    if board._makeable_tricks:
+        return board._makeable_tricks
+    table = tables.get(board)
+    if table is None:
+        tables.precompute(board, room_id)
+    return table
+
+
+class SolutionCache:
+    """A bounded LRU cache of solved positions, shared by every room."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Position, Solution] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, position: Position) -> Solution | None:
+        with self._lock:
+            solution = self._entries.get(position)
+            if solution is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(position)
+            self.hits += 1
+            return solution
+
+    def put(self, position: Position, solution: Solution) -> None:
+        with self._lock:
+            self._entries[position] = solution
+            self._entries.move_to_end(position)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def render(self) -> str:
+        """Return the lookup counts in Prometheus text format."""
+        name = "bfg_dd_solutions_total"
+        return (
+            f"# HELP {name} Double dummy positions looked up, by result.\n"
+            f"# TYPE {name} counter\n"
+            f'{name}{{result="hit"}} {self.hits}\n'
+            f'{name}{{result="miss"}} {self.misses}\n'
+        )
+
+
+def next_card(board: "Board", use_double_dummy: bool = False) -> "Card | None":
+    """Return the suggested card, the best double dummy card if asked."""
+    card = cardplay.next_card(board)
+    if not (use_double_dummy and card and board.tricks[0].cards):
+        return card
+    position = board_position(board)
+    if position is None:
+        return card
+    solution = solutions.get(position)
+    if solution is None:
+        solution = solve_position(board)
+        if solution is None:
+            return card
+        solutions.put(position, solution)
+    best = max(solution.values())
+    if solution.get(card.name) == best:
+        return card
+    return bridgeobjects.Card(
+        next(name for name, tricks in solution.items() if tricks == best)
+    )
+
+
+def board_position(board: "Board") -> Position | None:
+    """Return the position to be played, or None if there is none."""
+    trick = board.tricks[-1]
+    if len(trick.cards) == 4:
+        return None
+    played = {card.name for played in board.tricks for card in played.cards}
+    hands = tuple(
+        frozenset(card.name for card in board.hands[seat].cards) - played
+        for seat in bridgeobjects.SEATS
+    )
+    if not any(hands):
+        # Play is over, though the engine may still offer a card
+        return None
+    return (
+        board.contract.denomination.name,
+        trick.leader,
+        tuple(card.name for card in trick.cards),
+        hands,
+    )
+
+
+def solve_position(board: "Board") -> Solution | None:
+    """
+    Return the tricks taken after each card the player on move holds.
+
+    Return None if the solver is not free within DD_POSITION_WAIT_SECONDS.
+    """
+    deal = board.endplay_deal
+    if not _solver_lock.acquire(timeout=DD_POSITION_WAIT_SECONDS):
+        logger.info("dd-position-busy")
+        return None
+    try:
+        solved = list(dds.solve_board(deal))
+    finally:
+        _solver_lock.release()
+    return {_card_name(card): tricks for card, tricks in solved}
+
+
+def _card_name(card) -> str:
+    """Return an endplay card's name ("HT") as bridgeobjects' ("TH")."""
+    name = str(card)
+    return name[1] + name[0]
+
+
+tables = DoubleDummyTables(DD_TABLE_WORKERS, DD_TABLES_MAX_ENTRIES)
+precompute = tables.precompute
+solutions = SolutionCache(DD_SOLUTIONS_MAX_ENTRIES)
@@ -0,0 +1,176 @@
+"""
+Process pool that runs engine-bound actions for the async views.
+
+Bidding, cardplay and dealing are CPU bound and hold the GIL, so running
+them in the web process makes every other request wait, including cheap
+ones. The async views hand each action that needs a room to a worker in a
+ProcessPoolExecutor instead:
+
+- the view parses the request and fetches the room in a thread,
+- a worker runs the action on that (pickled) room inside a unit of work
+  opened with flush=False, and returns the response with unit.changes()
+  and unit.after_flush_calls(),
+- the view writes the changes in one transaction, as handle_request does,
+  and then makes the after_flush calls, which put the board in the board
+  cache and the context in the snapshot cache of the web process.
+
+A worker's own caches only hold what the view gives it: the room's board
+from the web process's board cache and the snapshot the request's
+since_version names, so the board is not rebuilt from the game log and a
+delta can be returned.
+
+Workers are started with "spawn", set Django up and import the engines
+before their first task, and are started as soon as the pool is created.
+At most ENGINE_POOL_SIZE actions run at once and ENGINE_QUEUE_DEPTH more
+may wait; beyond that EnginePool.run raises EnginePoolBusyError and the
+view answers 503, so a burst of slow claims cannot grow an unbounded queue.
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+
+import common.application as app
+from common.board_cache import board_cache, cache_board
+from common.snapshots import snapshot_cache, store_snapshot
+from common.unit_of_work import unit_of_work
+from common.utilities import GameRequest
+from config.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Imported by each worker before it takes its first task
+ENGINE_MODULES = (
+    "common.archive",
+    "common.bidding",
+    "common.board",
+    "common.cardplay",
+)
+
+
+class EnginePoolBusyError(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+class EnginePool:
+    """A bounded, lazily started pool of engine worker processes."""
+
+    def __init__(self, size: int, queue_depth: int) -> None:
+        self.size = size
+        self.queue_depth = queue_depth
+        self._in_flight = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, func: Callable, *args) -> object:
+        """Run func(*args) in a worker and return its result."""
+        # Only the event loop thread changes _in_flight, so no lock
+        if self._in_flight >= self.size + self.queue_depth:
+            raise EnginePoolBusyError(
+                f"{self._in_flight} engine calls in flight"
+            )
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._in_flight -= 1
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker,
+            )
+            # Workers are started on demand: one task each starts them all
+            for _ in range(self.size):
+                self._executor.submit(_ready)
+            logger.info("engine-pool started", size=self.size)
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def run_action(
+    action: str, req: GameRequest, args: tuple, cached: tuple = ()
+) -> tuple[object, list[tuple[str, object, dict[str, object]]], list]:
+    """
+    Run an application action in a worker.
+
+    cached holds calls that give the worker's caches the web process's
+    entries for the room (see cached_entries). Return the response, the
+    changes and the after_flush calls.
+    """
+    for call in cached:
+        call()
+    func = getattr(app, action)
+    with unit_of_work(flush=False) as unit:
+        response = func(req, *args)
+    return (response, unit.changes(), unit.after_flush_calls())
+
+
+def cached_entries(req: GameRequest) -> tuple:
+    """
+    Return calls that copy the room's cached board and snapshot elsewhere.
+
+    They are made in the worker, to fill its caches from this process's.
+    The board is taken out of the cache here, as load_board takes it.
+    """
+    room = req.room
+    calls = []
+    entry = board_cache.take_entry(room.pk, room.board_version)
+    if entry is not None:
+        calls.append(
+            partial(
+                cache_board,
+                room.pk,
+                entry.version,
+                entry.board,
+                entry.size,
+                entry.state,
+            )
+        )
+    if req.since_version:
+        snapshot = snapshot_cache.get(room.pk, req.since_version, req.mode)
+        if snapshot is not None:
+            calls.append(
+                partial(
+                    store_snapshot,
+                    room.pk,
+                    req.since_version,
+                    req.mode,
+                    snapshot,
+                )
+            )
+    return tuple(calls)
+
+
+def _initialize_worker() -> None:
+    import django
+
+    django.setup()
+    for module in ENGINE_MODULES:
+        importlib.import_module(module)
+
+
+def _ready() -> bool:
+    return True
+
+
+engine_pool = EnginePool(
+    getattr(settings, "ENGINE_POOL_SIZE", 1),
+    getattr(settings, "ENGINE_QUEUE_DEPTH", 0),
+)
@@ -0,0 +1,217 @@
+"""
+Append-only log of every change to a room's board.
+
+save_board no longer rewrites the whole board when a call is made or a card
+is played. It appends a GameEvent, numbered by the room's new board_version,
+naming the change by comparing the outline (common.codec.read_outline) of
+the board before and after it:
+
+    deal   a new board                  detail {}
+    call   calls added to the auction   detail {"calls": [...]}
+    card   cards played                 detail {"cards": [...]}
+    claim  the rest of the play at once detail {"cards": [...]}
+    undo   calls or cards taken back    detail {"calls": [...], "cards": [...]}
+           (undo, restart and replay)
+    state  any other change             detail {}
+
+Most events hold only a patch: the spans of the encoded board that changed,
+typically a few dozen bytes. A deal, and every event whose sequence is a
+multiple of GAME_SNAPSHOT_EVERY, holds the whole encoded board instead. The
+board at any sequence is rebuilt by board_state_at from the last full copy
+at or before it and the patches after it: one query of at most
+GAME_SNAPSHOT_EVERY rows and a single decode. load_board only needs this
+when the board cache misses.
+
+The log is also the audit trail of every game played in a room.
+"""
+
+import struct
+from typing import TYPE_CHECKING
+
+from common.codec import FIXED_SIZE, Outline, read_outline
+from common.constants import GAME_SNAPSHOT_EVERY
+from common.lazy import LazyModule
+from common.unit_of_work import save_new
+
+if TYPE_CHECKING:
+    from common.models import GameEvent, Room
+
+# The patch and replay functions do not need the app registry
+models = LazyModule("common.models")
+
+DEAL = "deal"
+CALL = "call"
+CARD = "card"
+CLAIM = "claim"
+UNDO = "undo"
+STATE = "state"
+
+# Each edit of a patch: the span of the old state it replaces and the length
+# of the bytes that replace it
+EDIT_HEADER = struct.Struct(">HHH")
+
+
+class GameLogError(RuntimeError):
+    """Raised when a room's events cannot be replayed."""
+
+
+def append_event(
+    room: "Room", old_state: bytes | None, new_state: bytes
+) -> "GameEvent":
+    """
+    Log the change from old_state to new_state as event room.board_version.
+
+    old_state is None when the previous board is not known, and the event
+    then holds the whole board.
+    """
+    (kind, detail) = describe_change(old_state, new_state)
+    sequence = room.board_version
+    full = (
+        old_state is None
+        or kind == DEAL
+        or sequence % GAME_SNAPSHOT_EVERY == 0
+    )
+    event = models.GameEvent(
+        room=room,
+        sequence=sequence,
+        kind=kind,
+        detail=detail,
+        patch=b"" if full else make_patch(old_state, new_state),
+        state=new_state if full else b"",
+    )
+    save_new(event)
+    return event
+
+
+def board_state_at(
+    room: "Room", sequence: int | None = None
+) -> bytes | None:
+    """Return the encoded board at sequence (default the latest), if logged."""
+    if sequence is None:
+        sequence = room.board_version
+    rows = (
+        models.GameEvent.objects.filter(
+            room=room,
+            sequence__gte=sequence - sequence % GAME_SNAPSHOT_EVERY,
+            sequence__lte=sequence,
+        )
+        .order_by("sequence")
+        .values_list("sequence", "patch", "state")
+    )
+    return replay(list(rows))
+
+
+def replay(rows: list[tuple[int, bytes, bytes]]) -> bytes | None:
+    """Apply (sequence, patch, state) rows, in order, from the last state."""
+    starts = [index for index, (_, _, state) in enumerate(rows) if state]
+    if not starts:
+        if rows:
+            raise GameLogError(f"No full board before event {rows[0][0]}")
+        return None
+    (sequence, _, state) = rows[starts[-1]]
+    state = bytes(state)
+    for next_sequence, patch, _ in rows[starts[-1] + 1:]:
+        if next_sequence != sequence + 1:
+            raise GameLogError(f"Event {sequence + 1} is missing")
+        state = apply_patch(state, bytes(patch))
+        sequence = next_sequence
+    return state
+
+
+def describe_change(
+    old_state: bytes | None, new_state: bytes
+) -> tuple[str, dict[str, list[str]]]:
+    """Return the kind of change from old_state to new_state and its detail."""
+    if old_state is None:
+        return (DEAL, {})
+    old = read_outline(old_state)
+    new = read_outline(new_state)
+    if old.deal != new.deal:
+        return (DEAL, {})
+
+    calls = _added(old.bid_history, new.bid_history)
+    cards = _added(old.cards, new.cards)
+    if calls and old.cards == new.cards:
+        return (CALL, {"calls": calls})
+    if cards and old.bid_history == new.bid_history:
+        return (_card_kind(cards, new), {"cards": cards})
+
+    calls = _added(new.bid_history, old.bid_history)
+    cards = _added(new.cards, old.cards)
+    if (calls or cards) and _is_rewind(old, new):
+        return (UNDO, {"calls": calls, "cards": cards})
+    return (STATE, {})
+
+
+def make_patch(old_state: bytes, new_state: bytes) -> bytes:
+    """Return the patch that turns old_state into new_state."""
+    edits = []
+    # The fixed-size part is compared byte by byte, the rest as one span
+    start = None
+    for index in range(FIXED_SIZE):
+        if old_state[index] != new_state[index]:
+            if start is None:
+                start = index
+        elif start is not None:
+            edits.append((start, index, new_state[start:index]))
+            start = None
+    if start is not None:
+        edits.append((start, FIXED_SIZE, new_state[start:FIXED_SIZE]))
+
+    limit = min(len(old_state), len(new_state))
+    prefix = FIXED_SIZE
+    while prefix < limit and old_state[prefix] == new_state[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and old_state[-1 - suffix] == new_state[-1 - suffix]
+    ):
+        suffix += 1
+    if prefix < len(old_state) - suffix or prefix < len(new_state) - suffix:
+        edits.append(
+            (
+                prefix,
+                len(old_state) - suffix,
+                new_state[prefix:len(new_state) - suffix],
+            )
+        )
+    return b"".join(
+        EDIT_HEADER.pack(start, end, len(data)) + data
+        for start, end, data in edits
+    )
+
+
+def apply_patch(state: bytes, patch: bytes) -> bytes:
+    parts = []
+    (position, offset) = (0, 0)
+    while offset < len(patch):
+        (start, end, length) = EDIT_HEADER.unpack_from(patch, offset)
+        offset += EDIT_HEADER.size
+        parts.append(state[position:start])
+        parts.append(patch[offset:offset + length])
+        offset += length
+        position = end
+    parts.append(state[position:])
+    return b"".join(parts)
+
+
+def _added(old: list[str], new: list[str]) -> list[str]:
+    """Return what new adds to old, if new extends it."""
+    if len(new) > len(old) and new[: len(old)] == old:
+        return new[len(old):]
+    return []
+
+
+def _card_kind(cards: list[str], new: Outline) -> str:
+    # Only a claim plays several cards and finishes the board in one go
+    if len(cards) > 1 and new.tricks_taken == 13:
+        return CLAIM
+    return CARD
+
+
+def _is_rewind(old: Outline, new: Outline) -> bool:
+    return (
+        old.bid_history[: len(new.bid_history)] == new.bid_history
+        and old.cards[: len(new.cards)] == new.cards
+    )
@@ -1,12 +1,43 @@
-"""Provide images for BfG functions."""
-
+"""
+Provide images for BfG functions.
+
+Card and call images are packed into one sprite sheet each. A sheet is a
+single PNG served from a content-hashed url (so it can be cached forever)
+together with a manifest giving the position of every image in it:
+
+    {
+        "url": "/sprites/cards-<hash>.png",
+        "width": ..., "height": ...,
+        "images": {"AS": [x, y, width, height], ...},
+    }
+
+Packing the sheets means decoding every PNG with PIL, so the result is
+cached on disk under IMAGE_CACHE_DIRECTORY in a file named after a hash of
+the source images. Workers map the cached file into memory and never import
+PIL; the sheet is rebuilt automatically when a source image changes, or
+ahead of time with "python manage.py build_sprites".
+"""
+
+import hashlib
 import io
+import json
+import mmap
+import os
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
-import base64
-from PIL import Image as PilImage
+from typing import TYPE_CHECKING
 
+from appdirs import user_cache_dir
 from bridgeobjects import CALLS, CARD_NAMES
 
+from config.logging import get_logger
+
+if TYPE_CHECKING:
+    from PIL import Image as PilImage
+
+logger = get_logger(__name__)
+
 BASE_DIRECTORY = 'locale/en_GB'
 IMAGE_DIRECTORY = 'images'
 CARD_IMAGE_DIRECTORY = 'card_images'
@@ -17,75 +48,182 @@ CURSOR = 'question_white'
 CALLS_EXTENSION = [CURSOR, 'blank', 'alert', 'stop', 'right', 'wrong']
 CALLS_REMOVE = ['A']
 
+# Sheets wrap onto a new row once a row is this wide (in pixels)
+SPRITE_ROW_WIDTH = 13 * 160
+
+# Bump when the layout or the cache file format changes
+SPRITE_FORMAT = 1
+SPRITE_EXTENSION = 'sprite'
+IMAGE_CACHE_DIRECTORY = Path(
+    os.getenv('BFG_IMAGE_CACHE', user_cache_dir('bfg_api')))
+
 
-class BaseImage():
-    """Base class for images."""
-    def __init__(self, name, source_directory, rotate):
-        self.name = name
-        image_directory = Path(
+@dataclass(frozen=True, slots=True)
+class SpriteImage:
+    """Defines a single image to be placed on a sprite sheet."""
+    name: str
+    source_directory: str
+    file_name: str
+    rotate: bool = False
+
+    @property
+    def path(self) -> Path:
+        return Path(
             Path(__file__).parent.parent,
             BASE_DIRECTORY,
             IMAGE_DIRECTORY,
-            source_directory
+            self.source_directory,
+            f'{self.file_name}.{IMAGE_EXTENSION}',
             )
-        image_path = Path(image_directory, f'{name}.{IMAGE_EXTENSION}')
-        image = PilImage.open(image_path)
-        if rotate:
-            image = image.rotate(90, expand=1)
-        self.image = self._encode_image(image)
-
-    @staticmethod
-    def _encode_image(image):
-        """Return image encoded to base64 from a PIL.Image.Image."""
-        io_buffer = io.BytesIO()
-        image.save(io_buffer, format='PNG')
-        saved_image = io_buffer.getvalue()
-        return ''.join(
-            ['data:image/jpg;base64,', base64.b64encode(saved_image).decode()])
-
-
-class CardImage(BaseImage):
-    """Defines a single card image."""
-    def __init__(self, name, rotate=False):
-        super().__init__(name, CARD_IMAGE_DIRECTORY, rotate)
 
-    def __repr__(self):
-        return f'CardImage("{self.name}")'
+    def load(self) -> 'PilImage.Image':
+        # PIL is only needed when a sheet is (re)built
+        from PIL import Image as PilImage
 
-    def __str__(self):
-        return f"CardImage: {self.name}"
-
-    @staticmethod
-    def get_images():
-        """Return a dict of call images."""
-        images = {card: CardImage(card).image for card in CARD_NAMES}
-        images['back'] = CardImage('back').image
-        images['back_rotated'] = CardImage('back', rotate=True).image
-        images['blank'] = CardImage('blank').image
-        return images
-
-
-class CallImage(BaseImage):
-    """Defines a single call image."""
-    def __init__(self, name, rotate=False):
-        super().__init__(name, CALL_IMAGE_DIRECTORY, rotate)
-
-    def __repr__(self):
-        return f'BidImage("{self.name}")'
-
-    def __str__(self):
-        return f"BidImage: {self.name}"
-
-    @staticmethod
-    def get_images():
-        """Return a dict of call images."""
-        calls = [call for call in CALLS if call not in CALLS_REMOVE]
-        calls.extend(CALLS_EXTENSION)
-        return {call: CallImage(call).image for call in calls}
-
-
-# call_images is a dict that contains all the valid calls
-CALL_IMAGES = CallImage.get_images()
-
-# card_images is a dict that contains all the valid cards
-CARD_IMAGES = CardImage.get_images()
+        image = PilImage.open(self.path).convert('RGBA')
+        if self.rotate:
+            image = image.rotate(90, expand=1)
+        return image
+
+
+@dataclass(frozen=True, slots=True)
+class Sprite:
+    """A packed sprite sheet and the position of each image in it."""
+    name: str
+    png: bytes | memoryview
+    width: int
+    height: int
+    images: dict[str, list[int]]
+    digest: str
+
+    @property
+    def file_name(self) -> str:
+        return f'{self.name}-{self.digest}.{IMAGE_EXTENSION}'
+
+    def manifest(self, url: str) -> dict[str, object]:
+        return {
+            'url': url,
+            'width': self.width,
+            'height': self.height,
+            'images': self.images,
+        }
+
+
+def card_images() -> list[SpriteImage]:
+    """Return the images for every card, the card backs and blank."""
+    images = [
+        SpriteImage(card, CARD_IMAGE_DIRECTORY, card) for card in CARD_NAMES]
+    images.append(SpriteImage('back', CARD_IMAGE_DIRECTORY, 'back'))
+    images.append(
+        SpriteImage('back_rotated', CARD_IMAGE_DIRECTORY, 'back', rotate=True))
+    images.append(SpriteImage('blank', CARD_IMAGE_DIRECTORY, 'blank'))
+    return images
+
+
+def call_images() -> list[SpriteImage]:
+    """Return the images for every call in the bidding box."""
+    calls = [call for call in CALLS if call not in CALLS_REMOVE]
+    calls.extend(CALLS_EXTENSION)
+    return [SpriteImage(call, CALL_IMAGE_DIRECTORY, call) for call in calls]
+
+
+def load_sprite(name: str, sprite_images: list[SpriteImage]) -> Sprite:
+    """Return the sprite from the disk cache, building it if it is stale."""
+    path = Path(IMAGE_CACHE_DIRECTORY,
+                f'{name}-{_source_digest(sprite_images)}.{SPRITE_EXTENSION}')
+    if not path.exists():
+        sprite = build_sprite(name, sprite_images)
+        try:
+            _write_sprite(path, sprite)
+        except OSError as error:
+            logger.warning('sprite-cache not writable', error=str(error))
+            return sprite
+        logger.info('sprite-cache built', path=str(path))
+    return _read_sprite(name, path)
+
+
+def _source_digest(sprite_images: list[SpriteImage]) -> str:
+    """Return a hash of the source PNGs and how they are laid out."""
+    digest = hashlib.sha256(f'{SPRITE_FORMAT}:{SPRITE_ROW_WIDTH}'.encode())
+    for image in sprite_images:
+        digest.update(f'{image.name}:{image.rotate}:'.encode())
+        digest.update(image.path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _write_sprite(path: Path, sprite: Sprite) -> None:
+    """
+    Write the sheet as a json header followed by the PNG.
+
+    The file is written under a temporary name and renamed into place, so
+    concurrently starting workers never see a partial file. Sheets built
+    from older sources are removed.
+    """
+    header = json.dumps({
+        'width': sprite.width,
+        'height': sprite.height,
+        'images': sprite.images,
+        'digest': sprite.digest,
+    }).encode()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+            dir=path.parent, delete=False) as temporary_file:
+        temporary_file.write(len(header).to_bytes(4, 'big'))
+        temporary_file.write(header)
+        temporary_file.write(sprite.png)
+    os.replace(temporary_file.name, path)
+    for stale in path.parent.glob(f'{sprite.name}-*.{SPRITE_EXTENSION}'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def _read_sprite(name: str, path: Path) -> Sprite:
+    """Map the cached sheet into memory; the PNG is served from the map."""
+    with open(path, 'rb') as cache_file:
+        mapped = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    header_length = int.from_bytes(mapped[:4], 'big')
+    header = json.loads(mapped[4:4 + header_length])
+    return Sprite(
+        name,
+        memoryview(mapped)[4 + header_length:],
+        header['width'],
+        header['height'],
+        header['images'],
+        header['digest'],
+    )
+
+
+def build_sprite(name: str, sprite_images: list[SpriteImage]) -> Sprite:
+    """Pack the images into rows and return the sheet as a PNG."""
+    from PIL import Image as PilImage
+
+    loaded = [(image.name, image.load()) for image in sprite_images]
+
+    positions = {}
+    (x, y, row_height, width) = (0, 0, 0, 0)
+    for image_name, image in loaded:
+        if x and x + image.width > SPRITE_ROW_WIDTH:
+            (x, y, row_height) = (0, y + row_height, 0)
+        positions[image_name] = [x, y, image.width, image.height]
+        x += image.width
+        width = max(width, x)
+        row_height = max(row_height, image.height)
+    height = y + row_height
+
+    sheet = PilImage.new('RGBA', (width, height), (0, 0, 0, 0))
+    for image_name, image in loaded:
+        (left, top, _, _) = positions[image_name]
+        sheet.paste(image, (left, top))
+
+    io_buffer = io.BytesIO()
+    sheet.save(io_buffer, format='PNG', optimize=True)
+    png = io_buffer.getvalue()
+    digest = hashlib.sha256(png).hexdigest()[:16]
+    return Sprite(name, png, width, height, positions, digest)
+
+
+# card_sprite holds every card image, call_sprite every bidding box image
+CARD_SPRITE = load_sprite('cards', card_images())
+CALL_SPRITE = load_sprite('calls', call_images())
+
+SPRITES = {sprite.file_name: sprite for sprite in (CARD_SPRITE, CALL_SPRITE)}
@@ -0,0 +1,38 @@
+"""
+Deferred imports for the bridge engines.
+
+Importing bfgdealer pulls in endplay, which in turn imports matplotlib and
+numpy; together the engines take about a second to import. Modules that
+only need an engine for some actions hold a LazyModule instead, so the
+engine is imported on the first attribute access rather than when the
+worker starts. Processes that only serve csrf, user status or static data
+never import the engines at all.
+
+    board = LazyModule("common.board")
+    ...
+    board.get_new_board(req)  # common.board is imported here
+"""
+
+import importlib
+from types import ModuleType
+
+
+class LazyModule:
+    """Stand-in for a module that is imported when first used."""
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: ModuleType | None = None
+
+    def __getattr__(self, attribute: str) -> object:
+        if self._module is None:
+            # import_module holds the module's import lock, so concurrent
+            # first uses from several threads import it only once
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
@@ -0,0 +1,115 @@
+"""
+Time building the board context, as get_board_context does for every reply.
+
+    python manage.py bench_board_context --boards 200
+    python manage.py bench_board_context --fields bid_history,bid_box_names
+
+Boards are the latest state of the configured database's rooms, topped up
+with random deals. Each board's double dummy table is worked out before the
+timing starts, so the figures are the context's own work: the bidding box,
+the BoardView and the rest of the keys ("hands" is the BoardView's hand
+facts alone). Saving the board is not included. --fields builds only those
+keys, as a request's fields do.
+"""
+
+import time
+
+from bfgdealer import DealerDuo
+from django.core.management.base import BaseCommand
+
+from common import contexts
+from common.codec import decode_board
+from common.constants import Mode
+from common.game_log import board_state_at
+from common.models import Room
+from common.utilities import (
+    GameRequest,
+    get_unplayed_cards_for_board_hands,
+)
+
+
+class Command(BaseCommand):
+    help = "Time building board contexts, without saving the board."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--boards", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--fields", default="")
+
+    def handle(self, *args, **options):
+        boards = _stored_boards(options["boards"])
+        stored = len(boards)
+        while len(boards) < options["boards"]:
+            board = DealerDuo().deal_random_board()
+            get_unplayed_cards_for_board_hands(board)
+            boards.append((Room(name="bench"), board))
+        for _, board in boards:
+            # Cached on the board from now on
+            _ = board.makeable_tricks
+        self.stdout.write(
+            f"{len(boards)} boards ({stored} from rooms), "
+            f"{options['repeat']} passes"
+        )
+
+        repeat = options["repeat"]
+        requests = []
+        for room, board in boards:
+            req = GameRequest(
+                mode=Mode.SOLO,
+                fields=frozenset(filter(None, options["fields"].split(","))),
+            )
+            req.room = room
+            requests.append((req, board))
+        rows = (
+            (
+                "context",
+                _mean(
+                    lambda: [
+                        contexts._board_context(req, board)
+                        for req, board in requests
+                    ],
+                    repeat,
+                ),
+            ),
+            (
+                "hands",
+                _mean(
+                    lambda: [
+                        _hand_facts(contexts.BoardView(board, room))
+                        for room, board in boards
+                    ],
+                    repeat,
+                ),
+            ),
+        )
+        self.stdout.write(f"{'step':<8} {'mean us':>10}")
+        for name, seconds in rows:
+            self.stdout.write(
+                f"{name:<8} {seconds / len(boards) * 1e6:>10.1f}"
+            )
+
+
+def _hand_facts(view: contexts.BoardView) -> tuple:
+    return (
+        view.hand_cards,
+        view.unplayed_card_names,
+        view.max_suit_length,
+        view.hand_suit_length,
+    )
+
+
+def _stored_boards(limit: int) -> list[tuple[Room, object]]:
+    boards = []
+    for room in Room.objects.all()[:limit]:
+        state = board_state_at(room)
+        if state is not None:
+            boards.append((room, decode_board(state)))
+    return boards
+
+
+def _mean(func, repeat: int) -> float:
+    """Return the mean wall time of func over repeat runs, in seconds."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
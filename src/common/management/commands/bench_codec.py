@@ -0,0 +1,90 @@
+"""
+Compare the board codec with Board's json serialisation.
+
+    python manage.py bench_codec --boards 200
+
+Boards are taken from the configured database's rooms, topped up with
+random deals, and each is written and read back both ways. The command
+reports the mean time of each step in microseconds and the mean stored size
+in bytes, which is what save_board and load_board pay on a board cache miss.
+"""
+
+import time
+
+from bfgdealer import Board, DealerDuo
+from django.core.management.base import BaseCommand
+
+from common.codec import decode_board, encode_board, is_encoded
+from common.models import Room
+from common.utilities import get_unplayed_cards_for_board_hands
+
+
+class Command(BaseCommand):
+    help = "Time and size the board codec against Board.to_json."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--boards", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        boards = _stored_boards(options["boards"])
+        stored = len(boards)
+        while len(boards) < options["boards"]:
+            board = DealerDuo().deal_random_board()
+            get_unplayed_cards_for_board_hands(board)
+            boards.append(board)
+        self.stdout.write(
+            f"{len(boards)} boards ({stored} from rooms), "
+            f"{options['repeat']} passes"
+        )
+
+        repeat = options["repeat"]
+        json_rows = [board.to_json() for board in boards]
+        state_rows = [encode_board(board) for board in boards]
+        rows = [
+            (
+                "json",
+                _mean(lambda: [board.to_json() for board in boards], repeat),
+                _mean(
+                    lambda: [Board().from_json(row) for row in json_rows],
+                    repeat,
+                ),
+                sum(len(row.encode()) for row in json_rows),
+            ),
+            (
+                "codec",
+                _mean(lambda: [encode_board(board) for board in boards],
+                      repeat),
+                _mean(lambda: [decode_board(row) for row in state_rows],
+                      repeat),
+                sum(len(row) for row in state_rows),
+            ),
+        ]
+        self.stdout.write(
+            f"{'format':<8} {'write us':>10} {'read us':>10} {'bytes':>8}"
+        )
+        for name, write, read, size in rows:
+            self.stdout.write(
+                f"{name:<8} {write / len(boards) * 1e6:>10.1f} "
+                f"{read / len(boards) * 1e6:>10.1f} "
+                f"{size / len(boards):>8.0f}"
+            )
+
+
+def _stored_boards(limit: int) -> list[Board]:
+    boards = []
+    rooms = Room.objects.only("board", "board_state")
+    for room in rooms[:limit]:
+        if is_encoded(room.board_state):
+            boards.append(decode_board(room.board_state))
+        elif room.board:
+            boards.append(Board().from_json(room.board))
+    return boards
+
+
+def _mean(func, repeat: int) -> float:
+    """Return the mean wall time of func over repeat runs, in seconds."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
@@ -0,0 +1,109 @@
+"""
+Benchmark Room and User lookups as the tables grow.
+
+    python manage.py bench_lookups --rows 1000000
+
+Rows are added in steps (1k, 10k, 100k, ...) and at each step the command
+times lookups of existing names and insert-on-conflict upserts of new ones.
+With the unique indexes on Room.name and User.username both should stay flat
+as the tables grow. It runs against a throwaway SQLite database, never the
+configured one.
+"""
+
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from common.models import Room, User
+
+BENCH_DATABASE = "bench"
+BATCH_SIZE = 10_000
+
+
+class Command(BaseCommand):
+    help = "Time room and user lookups and upserts as row counts grow."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--lookups", type=int, default=2_000)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            _add_bench_database(Path(directory, "bench.sqlite3"))
+            call_command("migrate", database=BENCH_DATABASE, verbosity=0)
+            try:
+                self._run(options["rows"], options["lookups"])
+            finally:
+                connections[BENCH_DATABASE].close()
+
+    def _run(self, max_rows: int, lookups: int) -> None:
+        self.stdout.write(
+            f"{'rows':>10} {'room get':>10} {'room upsert':>12} "
+            f"{'user get':>10} {'user upsert':>12}   (microseconds)"
+        )
+        rows = 0
+        step = 1_000
+        while rows < max_rows:
+            target = min(step, max_rows)
+            _add_rows(Room, "name", "room", rows, target)
+            _add_rows(User, "username", "user", rows, target)
+            rows = target
+            step *= 10
+            timings = (
+                _time_gets(Room, "name", "room", rows, lookups),
+                _time_upserts(Room, "name", "new-room", rows, lookups),
+                _time_gets(User, "username", "user", rows, lookups),
+                _time_upserts(User, "username", "new-user", rows, lookups),
+            )
+            self.stdout.write(
+                f"{rows:>10} {timings[0]:>10.1f} {timings[1]:>12.1f} "
+                f"{timings[2]:>10.1f} {timings[3]:>12.1f}"
+            )
+
+
+def _add_bench_database(path: Path) -> None:
+    config = dict(connections.settings["default"])
+    config["NAME"] = str(path)
+    connections.settings[BENCH_DATABASE] = config
+
+
+def _add_rows(
+    model: type, field: str, prefix: str, start: int, stop: int
+) -> None:
+    manager = model.objects.using(BENCH_DATABASE)
+    for batch_start in range(start, stop, BATCH_SIZE):
+        batch_stop = min(batch_start + BATCH_SIZE, stop)
+        manager.bulk_create(
+            [
+                model(**{field: f"{prefix}-{index}"})
+                for index in range(batch_start, batch_stop)
+            ]
+        )
+
+
+def _time_gets(
+    model: type, field: str, prefix: str, rows: int, lookups: int
+) -> float:
+    manager = model.objects.using(BENCH_DATABASE)
+    names = [f"{prefix}-{random.randrange(rows)}" for _ in range(lookups)]
+    start = time.perf_counter()
+    for name in names:
+        manager.get(**{field: name})
+    return (time.perf_counter() - start) / lookups * 1_000_000
+
+
+def _time_upserts(
+    model: type, field: str, prefix: str, rows: int, lookups: int
+) -> float:
+    manager = model.objects.using(BENCH_DATABASE)
+    names = [f"{prefix}-{rows}-{index}" for index in range(lookups)]
+    start = time.perf_counter()
+    for name in names:
+        manager.bulk_create([model(**{field: name})], ignore_conflicts=True)
+        manager.get(**{field: name})
+    return (time.perf_counter() - start) / lookups * 1_000_000
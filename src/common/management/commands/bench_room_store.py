@@ -0,0 +1,123 @@
+"""
+Compare the RoomStore backends.
+
+    python manage.py bench_room_store --rooms 200 --operations 2000
+    python manage.py bench_room_store --redis-url redis://localhost:6379/15
+
+For each backend the command times get (of existing rooms), compare_and_set
+of a room's board_version (half of them with a stale expected version, so
+they fail) and append_archive. The Django backend runs against a throwaway
+SQLite database, never the configured one; Redis is only timed when
+--redis-url is given, and its keys are left in that database.
+"""
+
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from common.management.commands.bench_lookups import (
+    BENCH_DATABASE,
+    _add_bench_database,
+)
+from common.models import ArchivedBoard
+from common.room_store import (
+    DjangoRoomStore,
+    MemoryRoomStore,
+    RedisRoomStore,
+    RoomStore,
+)
+
+PBN = (
+    "N:AK32.QJ4.T98.765 QJT.AK32.765.432 987.T98.AKQ.AKQT 654.765.J432.J98"
+)
+
+
+class Command(BaseCommand):
+    help = "Time get, compare-and-set and append-archive on each RoomStore."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=200)
+        parser.add_argument("--operations", type=int, default=2_000)
+        parser.add_argument("--redis-url", default="")
+
+    def handle(self, *args, **options):
+        stores: list[tuple[str, RoomStore]] = [("memory", MemoryRoomStore())]
+        if options["redis_url"]:
+            try:
+                redis_store = RedisRoomStore.from_url(options["redis_url"])
+            except ImportError as error:
+                raise CommandError(
+                    "pip install redis to time Redis"
+                ) from error
+            stores.append(("redis", redis_store))
+
+        with tempfile.TemporaryDirectory() as directory:
+            _add_bench_database(Path(directory, "bench.sqlite3"))
+            call_command("migrate", database=BENCH_DATABASE, verbosity=0)
+            stores.insert(1, ("django", DjangoRoomStore(BENCH_DATABASE)))
+            try:
+                self._run(stores, options["rooms"], options["operations"])
+            finally:
+                connections[BENCH_DATABASE].close()
+
+    def _run(
+        self, stores: list[tuple[str, RoomStore]], rooms: int, operations: int
+    ) -> None:
+        self.stdout.write(
+            f"{'backend':>8} {'get':>10} {'cas':>10} {'archive':>10}"
+            "   (microseconds)"
+        )
+        names = [f"bench-room-{index}" for index in range(rooms)]
+        for label, store in stores:
+            for name in names:
+                store.get(name)
+            timings = (
+                _time_gets(store, names, operations),
+                _time_compare_and_sets(store, names, operations),
+                _time_appends(store, names, operations),
+            )
+            self.stdout.write(
+                f"{label:>8} {timings[0]:>10.1f} {timings[1]:>10.1f} "
+                f"{timings[2]:>10.1f}"
+            )
+
+
+def _time_gets(store: RoomStore, names: list[str], operations: int) -> float:
+    picks = [random.choice(names) for _ in range(operations)]
+    start = time.perf_counter()
+    for name in picks:
+        store.get(name)
+    return (time.perf_counter() - start) / operations * 1_000_000
+
+
+def _time_compare_and_sets(
+    store: RoomStore, names: list[str], operations: int
+) -> float:
+    rooms = {name: store.get(name) for name in names}
+    picks = [rooms[random.choice(names)] for _ in range(operations)]
+    start = time.perf_counter()
+    for index, room in enumerate(picks):
+        # Every other call expects a version that is no longer stored
+        expected = room.board_version if index % 2 else -1
+        if store.compare_and_set(
+            room,
+            {"board_version": expected},
+            {"board_version": expected + 1},
+        ):
+            room.board_version = expected + 1
+    return (time.perf_counter() - start) / operations * 1_000_000
+
+
+def _time_appends(
+    store: RoomStore, names: list[str], operations: int
+) -> float:
+    rooms = [store.get(random.choice(names)) for _ in range(operations)]
+    start = time.perf_counter()
+    for room in rooms:
+        store.append_archive(room, ArchivedBoard(pbn=PBN))
+    return (time.perf_counter() - start) / operations * 1_000_000
@@ -0,0 +1,24 @@
+"""
+Build the card and call sprite sheets into the image cache.
+
+    python manage.py build_sprites
+
+Workers build a stale sheet themselves on start-up; running this as a
+deployment step means none of them has to.
+"""
+
+from django.core.management.base import BaseCommand
+
+from common.images import SPRITES
+
+
+class Command(BaseCommand):
+    help = "Build the sprite sheets into the image cache."
+
+    def handle(self, *args, **options):
+        # Importing common.images loads every sheet, building stale ones
+        for file_name, sprite in SPRITES.items():
+            self.stdout.write(
+                f"{file_name} {sprite.width}x{sprite.height} "
+                f"{len(sprite.images)} images {len(sprite.png)} bytes"
+            )
@@ -0,0 +1,84 @@
+"""
+Report what a cold worker spends importing, aggregated by package.
+
+    python manage.py import_times
+    python manage.py import_times --module common.board --depth 2
+
+The module is imported in a fresh interpreter under "python -X importtime"
+after django.setup(), so Django's own start-up is reported separately from
+the module's. Each module's self time is added to its top-level package (or
+the first --depth components of its name) and packages are listed slowest
+first. Compare the totals between releases to catch cold-start regressions.
+"""
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+SETUP = "import django; django.setup()"
+
+
+class Command(BaseCommand):
+    help = "Report import time by package for a cold worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--module", default="config.urls")
+        parser.add_argument("--depth", type=int, default=1)
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup = _import_times(SETUP)
+        full = _import_times(f"{SETUP}; import {options['module']}")
+        module_times = {
+            name: micros
+            for name, micros in full.items()
+            if name not in setup
+        }
+
+        packages = defaultdict(lambda: [0, 0])
+        for name, micros in module_times.items():
+            package = ".".join(name.split(".")[: options["depth"]])
+            packages[package][0] += micros
+            packages[package][1] += 1
+
+        self.stdout.write(f"{'package':<40} {'ms':>9} {'modules':>8}")
+        ranked = sorted(packages.items(), key=lambda item: -item[1][0])
+        for package, (micros, count) in ranked[: options["top"]]:
+            self.stdout.write(
+                f"{package:<40} {micros / 1000:>9.1f} {count:>8}"
+            )
+        self.stdout.write(
+            f"{'django.setup()':<40} {sum(setup.values()) / 1000:>9.1f} "
+            f"{len(setup):>8}"
+        )
+        self.stdout.write(
+            f"{options['module']:<40} "
+            f"{sum(module_times.values()) / 1000:>9.1f} "
+            f"{len(module_times):>8}"
+        )
+
+
+def _import_times(code: str) -> dict[str, int]:
+    """Return the self import time in microseconds of each module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=False,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        (self_time, _, name) = line[len("import time:"):].split("|")
+        if self_time.strip().isdigit():
+            times[name.strip()] = int(self_time)
+    return times
@@ -0,0 +1,103 @@
+"""
+Check that partners writing one room at the same time lose no updates.
+
+    python manage.py stress_room_writes --partners 2 --writes 200
+
+Each partner is a thread that, like a request, reads the room, waits a
+moment (the engines' turn) and writes room.board_version + 1 in a unit of
+work, run by run_in_unit_of_work as the views run requests. Every write
+that is not answered 409 must show in the final board_version; the command
+fails if any is lost. It runs against a throwaway SQLite database, never
+the configured one.
+"""
+
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+import common.room_store
+from common.management.commands.bench_lookups import (
+    BENCH_DATABASE,
+    _add_bench_database,
+)
+from common.room_store import DjangoRoomStore
+from common.unit_of_work import (
+    StaleRoomError,
+    run_in_unit_of_work,
+    save_fields,
+)
+
+ROOM_NAME = "stress-room"
+
+
+class Command(BaseCommand):
+    help = "Write one room from parallel partners and count lost updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partners", type=int, default=2)
+        parser.add_argument("--writes", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            _add_bench_database(Path(directory, "bench.sqlite3"))
+            call_command("migrate", database=BENCH_DATABASE, verbosity=0)
+            store = common.room_store.room_store
+            common.room_store.room_store = DjangoRoomStore(BENCH_DATABASE)
+            try:
+                self._run(options["partners"], options["writes"])
+            finally:
+                common.room_store.room_store = store
+                connections[BENCH_DATABASE].close()
+
+    def _run(self, partners: int, writes: int) -> None:
+        store = common.room_store.room_store
+        store.get(ROOM_NAME)
+        counts = {"written": 0, "rejected": 0, "attempts": 0}
+        lock = threading.Lock()
+
+        def write_once() -> None:
+            with lock:
+                counts["attempts"] += 1
+            room = store.get(ROOM_NAME)
+            time.sleep(random.random() / 1000)
+            room.board_version += 1
+            save_fields(room, "board_version")
+
+        def partner() -> None:
+            try:
+                for _ in range(writes):
+                    try:
+                        run_in_unit_of_work(write_once)
+                        outcome = "written"
+                    except StaleRoomError:
+                        outcome = "rejected"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connections[BENCH_DATABASE].close()
+
+        threads = [threading.Thread(target=partner) for _ in range(partners)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        room = store.get(ROOM_NAME)
+        lost = counts["written"] - room.board_version
+        self.stdout.write(
+            f"partners={partners} written={counts['written']} "
+            f"rejected={counts['rejected']} "
+            f"retried={counts['attempts'] - partners * writes} "
+            f"board_version={room.board_version} lost={lost} "
+            f"({elapsed:.2f}s)"
+        )
+        if lost:
+            raise CommandError(f"{lost} updates were lost")
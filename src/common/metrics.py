@@ -0,0 +1,210 @@
+"""
+Per-endpoint latency histograms broken down by phase.
+
+MetricsMiddleware opens a PhaseTimer for every request. Code marks the work
+it does with measure(phase), or the timed(phase) decorator:
+
+    parse      decoding the request json into a GameRequest
+    db         every SQL query (via connection.execute_wrapper)
+    board      rebuilding and serialising the Board (load_board, save_board)
+    engine     the bidding, cardplay and dealing engines
+    context    building the board context returned to the client
+    serialize  encoding the response json
+
+Phases nest: time is charged to the innermost phase only, so a query made
+while building the context counts as db, not context. Whatever is left over
+is reported as "other" and the whole request as "total".
+
+The histograms are held in memory per process and exposed in Prometheus
+text format at /metrics/. Each worker process reports its own figures.
+"""
+
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from django.db import connection
+
+PARSE = "parse"
+DB = "db"
+BOARD = "board"
+ENGINE = "engine"
+CONTEXT = "context"
+SERIALIZE = "serialize"
+OTHER = "other"
+TOTAL = "total"
+
+# Upper bounds of the histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0,
+)
+
+METRIC_NAME = "bfg_request_phase_seconds"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Count observations into fixed buckets."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> list[int]:
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class PhaseTimer:
+    """Accumulate the time a single request spends in each phase."""
+
+    def __init__(self) -> None:
+        self.totals: dict[str, float] = {}
+        # [phase, started] for each open phase, innermost last
+        self._stack: list[list] = []
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        now = perf_counter()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        self._stack.append([phase, now])
+        try:
+            yield
+        finally:
+            now = perf_counter()
+            self._charge(self._stack.pop(), now)
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def _charge(self, entry: list, now: float) -> None:
+        (phase, started) = entry
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - started
+
+
+class Metrics:
+    """The latency histograms of every endpoint and phase."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, timer: PhaseTimer, total: float) -> None:
+        """Add one request's phase times to the histograms."""
+        observations = dict(timer.totals)
+        observations[OTHER] = max(total - sum(timer.totals.values()), 0.0)
+        observations[TOTAL] = total
+        with self._lock:
+            for phase, seconds in observations.items():
+                key = (endpoint, phase)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.buckets)
+                self._histograms[key].observe(seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Return the histograms in Prometheus text format."""
+        lines = [
+            f"# HELP {METRIC_NAME} Request time spent in each phase.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for (endpoint, phase), histogram in sorted(
+                self._histograms.items()
+            ):
+                labels = (
+                    f'endpoint="{_escape(endpoint)}",phase="{_escape(phase)}"'
+                )
+                bounds = [str(bound) for bound in histogram.buckets]
+                counts = histogram.cumulative_counts()
+                for bound, count in zip(bounds, counts, strict=True):
+                    lines.append(
+                        f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} '
+                        f"{count}"
+                    )
+                lines.append(
+                    f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} '
+                    f"{histogram.count}"
+                )
+                lines.append(f"{METRIC_NAME}_sum{{{labels}}} {histogram.sum}")
+                lines.append(
+                    f"{METRIC_NAME}_count{{{labels}}} {histogram.count}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+metrics = Metrics()
+
+_current_timer: ContextVar[PhaseTimer | None] = ContextVar(
+    "phase_timer", default=None
+)
+
+
+@contextmanager
+def request_timer() -> Iterator[PhaseTimer]:
+    """Time the phases of one request, including all of its SQL queries."""
+    timer = PhaseTimer()
+    token = _current_timer.set(timer)
+    try:
+        with connection.execute_wrapper(_time_query):
+            yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def measure(phase: str) -> Iterator[None]:
+    """Charge the enclosed code to phase, if a request is being timed."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.measure(phase):
+        yield
+
+
+def timed(phase: str) -> Callable:
+    """Decorate a function so that its calls are charged to phase."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(phase):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _time_query(execute, sql, params, many, context):
+    with measure(DB):
+        return execute(sql, params, many, context)
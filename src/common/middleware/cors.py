@@ -1,39 +1,68 @@
 # common/middleware/cors.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.http import HttpResponse
 
 
 class BfgCorsMiddleware:
+    # Both, so that async views are not forced through a thread
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        origin = request.headers.get("Origin")
-
-        # Handle preflight OPTIONS for /bfg/ paths
-        if request.method == "OPTIONS" and request.path.startswith("/bfg/"):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if _is_preflight(request):
             response = HttpResponse(status=204)  # 204 No Content is preferred
         else:
             response = self.get_response(request)
+        return _add_cors_headers(request, response)
 
-        # Only add CORS headers for /bfg/ paths
-        if not request.path.startswith("/bfg/"):
-            return response
-
-        # Dev override
-        if getattr(settings, "BFG_CORS_ALLOW_ALL_DEV", False):
-            response["Access-Control-Allow-Origin"] = origin or "*"
-        # Production: exact match
-        elif origin and origin in getattr(settings, "BFG_CORS_ALLOWED_ORIGINS", []):
-            response["Access-Control-Allow-Origin"] = origin
+    async def __acall__(self, request):
+        if _is_preflight(request):
+            response = HttpResponse(status=204)
         else:
-            # No match – no CORS headers (correct behavior)
-            return response
+            response = await self.get_response(request)
+        return _add_cors_headers(request, response)
+
+
+def _is_preflight(request) -> bool:
+    # Handle preflight OPTIONS for /bfg/ paths
+    return request.method == "OPTIONS" and request.path.startswith("/bfg/")
 
-        # Standard headers
-        response["Access-Control-Allow-Credentials"] = "true"
-        response["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS, PUT, DELETE"
-        response["Access-Control-Allow-Headers"] = "X-CSRFToken, Content-Type, Authorization"
-        response["Access-Control-Max-Age"] = "86400"
 
+def _add_cors_headers(request, response):
+    origin = request.headers.get("Origin")
+
+    # Only add CORS headers for /bfg/ paths
+    if not request.path.startswith("/bfg/"):
+        return response
+
+    # Dev override
+    if getattr(settings, "BFG_CORS_ALLOW_ALL_DEV", False):
+        response["Access-Control-Allow-Origin"] = origin or "*"
+    # Production: exact match
+    elif origin and origin in getattr(
+        settings, "BFG_CORS_ALLOWED_ORIGINS", []
+    ):
+        response["Access-Control-Allow-Origin"] = origin
+    else:
+        # No match – no CORS headers (correct behavior)
         return response
+
+    # Standard headers
+    response["Access-Control-Allow-Credentials"] = "true"
+    response["Access-Control-Allow-Methods"] = (
+        "GET, POST, OPTIONS, PUT, DELETE"
+    )
+    response["Access-Control-Allow-Headers"] = (
+        "X-CSRFToken, Content-Type, Authorization"
+    )
+    response["Access-Control-Max-Age"] = "86400"
+
+    return response
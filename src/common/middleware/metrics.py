@@ -0,0 +1,43 @@
+# common/middleware/metrics.py
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from common.metrics import metrics, request_timer
+
+
+class MetricsMiddleware:
+    """Record the latency of every request, by endpoint and phase."""
+
+    # Both, so that async views are not forced through a thread
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = perf_counter()
+        with request_timer() as timer:
+            response = self.get_response(request)
+        metrics.record(_endpoint(request), timer, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        with request_timer() as timer:
+            response = await self.get_response(request)
+        metrics.record(_endpoint(request), timer, perf_counter() - started)
+        return response
+
+
+def _endpoint(request) -> str:
+    """Return the url pattern that matched, e.g. "card-played"."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.route.rstrip("/") or "/"
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0014_alter_user_last_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='board_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
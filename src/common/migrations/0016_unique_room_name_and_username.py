@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_rows(apps, schema_editor):
+    """Keep one row per room name and username before adding the indexes."""
+    Room = apps.get_model('common', 'Room')
+    User = apps.get_model('common', 'User')
+
+    duplicate_names = (Room.objects.values('name')
+                       .annotate(rows=Count('id')).filter(rows__gt=1)
+                       .values_list('name', flat=True))
+    for name in list(duplicate_names):
+        rooms = Room.objects.filter(name=name).order_by('-board_version',
+                                                         '-id')
+        Room.objects.filter(name=name).exclude(pk=rooms[0].pk).delete()
+
+    duplicate_usernames = (User.objects.values('username')
+                           .annotate(rows=Count('id')).filter(rows__gt=1)
+                           .values_list('username', flat=True))
+    for username in list(duplicate_usernames):
+        users = list(User.objects.filter(username=username).order_by('-id'))
+        keep = users[0]
+        keep.logged_in = any(user.logged_in for user in users)
+        activity = [user.last_activity for user in users
+                    if user.last_activity]
+        keep.last_activity = max(activity) if activity else None
+        keep.save()
+        User.objects.filter(username=username).exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0015_room_board_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_rows,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='room',
+            name='name',
+            field=models.CharField(max_length=180, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='username',
+            field=models.CharField(max_length=32, unique=True),
+        ),
+    ]
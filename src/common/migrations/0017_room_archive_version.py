@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0016_unique_room_name_and_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='archive_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,244 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:05
+
+import struct
+
+from django.db import migrations, models
+
+# The board codec (common.codec) as it was when this migration was written,
+# CODEC_VERSION 1. It is frozen here so that later changes to the codec do
+# not change what the migration does.
+
+MAGIC = b'BG'
+CODEC_VERSION = 1
+SEATS = ['N', 'E', 'S', 'W']
+SEAT_VALUES = [*SEATS, '', None]
+SEAT_CODES = {seat: index for index, seat in enumerate(SEAT_VALUES)}
+(NONE, FALSE, TRUE, SMALL_INT, INT, STRING) = range(6)
+CALL_ESCAPE = 255
+INDEX_KEYED_HANDS = 1
+HAS_MAKEABLE_TRICKS = 2
+
+
+def is_encoded(data):
+    return isinstance(data, (bytes, memoryview)) and bytes(data[:2]) == MAGIC
+
+
+def encode_board(board):
+    from bridgeobjects import CALLS, CARD_NAMES
+
+    card_index = {name: index for index, name in enumerate(CARD_NAMES)}
+    call_index = {name: index for index, name in enumerate(CALLS)}
+
+    def card_mask(cards):
+        mask = 0
+        for card in cards:
+            mask |= 1 << card_index[card.name]
+        return mask.to_bytes(7, 'big')
+
+    def write_calls(calls):
+        out.append(len(calls))
+        for call in calls:
+            if call in call_index:
+                out.append(call_index[call])
+            else:
+                out.append(CALL_ESCAPE)
+                write_value(call)
+
+    def write_seat(seat):
+        out.append(SEAT_CODES[seat])
+
+    def write_value(value):
+        if value is None:
+            out.append(NONE)
+        elif value is False:
+            out.append(FALSE)
+        elif value is True:
+            out.append(TRUE)
+        elif isinstance(value, int) and -128 <= value < 128:
+            out.append(SMALL_INT)
+            out.extend(struct.pack('>b', value))
+        elif isinstance(value, int):
+            out.append(INT)
+            out.extend(struct.pack('>q', value))
+        else:
+            encoded = value.encode()
+            out.append(STRING)
+            out.extend(struct.pack('>H', len(encoded)))
+            out.extend(encoded)
+
+    out = bytearray(MAGIC)
+    out.append(CODEC_VERSION)
+    flags = 0
+    if 0 in board.hands:
+        flags |= INDEX_KEYED_HANDS
+    if board._makeable_tricks is not None:
+        flags |= HAS_MAKEABLE_TRICKS
+    out.append(flags)
+    for seat in SEATS:
+        out.extend(card_mask(board.hands[seat].cards))
+        out.extend(card_mask(board.hands[seat].unplayed_cards))
+    write_calls(board.bid_history)
+    write_calls([call.name for call in board._auction.calls])
+    write_seat(board._auction.first_caller)
+    write_value(board._contract.name)
+    write_seat(board._contract.declarer)
+    out.append(len(board.tricks))
+    for trick in [*board.tricks, board.current_trick]:
+        write_seat(trick.leader)
+        write_seat(trick.winner)
+        out.append(len(trick.cards))
+        out.extend(card_index[card.name] for card in trick.cards)
+    for seat in (board.current_player, board.declarer, board.dealer):
+        write_seat(seat)
+    for value in (board.warning, board.declarer_index,
+                  board.declarers_tricks, board.dealer_index,
+                  board.description, board.north, board.east, board.south,
+                  board.west, board.NS_tricks, board.EW_tricks, board._stage,
+                  board.source, board.vulnerable, board.identifier):
+        write_value(value)
+    if flags & HAS_MAKEABLE_TRICKS:
+        for seat in SEATS:
+            levels = board._makeable_tricks[seat]
+            out.append(len(levels))
+            for level in levels:
+                write_value(level)
+    return bytes(out)
+
+
+def decode_board(data):
+    from bfgdealer import Board
+    from bridgeobjects import CALLS, CARD_NAMES, Auction, Card, Contract, Trick
+
+    data = bytes(data)
+    position = 0
+
+    def take(size):
+        nonlocal position
+        position += size
+        return data[position - size:position]
+
+    def byte():
+        return take(1)[0]
+
+    def seat():
+        return SEAT_VALUES[byte()]
+
+    def value():
+        tag = byte()
+        if tag == SMALL_INT:
+            return struct.unpack('>b', take(1))[0]
+        if tag == INT:
+            return struct.unpack('>q', take(8))[0]
+        if tag == STRING:
+            (length,) = struct.unpack('>H', take(2))
+            return take(length).decode()
+        return {NONE: None, FALSE: False, TRUE: True}[tag]
+
+    def calls():
+        names = []
+        for _ in range(byte()):
+            index = byte()
+            names.append(value() if index == CALL_ESCAPE else CALLS[index])
+        return names
+
+    def cards_from_mask(mask):
+        mask = int.from_bytes(mask, 'big')
+        return [card for index, card in enumerate(cards) if mask >> index & 1]
+
+    take(3)
+    flags = byte()
+    cards = [Card(name) for name in CARD_NAMES]
+    board = Board()
+    hands = {}
+    for index, hand_seat in enumerate(SEATS):
+        hand = board.hands[hand_seat]
+        hand.cards = cards_from_mask(take(7))
+        hand.unplayed_cards = cards_from_mask(take(7))
+        hands[hand_seat] = hand
+        board.players[hand_seat].hand = hand
+        if flags & INDEX_KEYED_HANDS:
+            hands[index] = hand
+            board.players[index].hand = hand
+    bid_history = calls()
+    board._auction = Auction(calls(), seat())
+    board.bid_history = bid_history
+    contract_name = value()
+    if contract_name == 'None':
+        contract_name = None
+    board._contract = Contract(contract_name, seat())
+    tricks = []
+    for _ in range(byte() + 1):
+        trick = Trick()
+        trick.leader = seat()
+        trick.winner = seat()
+        trick.cards = [cards[index] for index in take(byte())]
+        tricks.append(trick)
+    (current_player, declarer, dealer) = (seat(), seat(), seat())
+    (board.warning, declarer_index, declarers_tricks, dealer_index,
+     board.description, north, east, south, west, ns_tricks, ew_tricks,
+     stage, source, vulnerable, identifier) = (value() for _ in range(15))
+    board.current_player = current_player
+    board.declarer = declarer
+    board.declarer_index = declarer_index
+    board.declarers_tricks = declarers_tricks
+    board.dealer = dealer
+    board.dealer_index = dealer_index
+    board.east = east
+    board.EW_tricks = ew_tricks
+    board.hands = hands
+    board.north = north
+    board.NS_tricks = ns_tricks
+    board.south = south
+    board._stage = stage
+    board.source = source
+    board.vulnerable = vulnerable
+    board.west = west
+    board.identifier = 0 if identifier == '' else identifier
+    board.tricks = tricks[:-1]
+    board.current_trick = tricks[-1]
+    board.initialise_tricks()
+    board._makeable_tricks = None
+    if flags & HAS_MAKEABLE_TRICKS:
+        board._makeable_tricks = {
+            hand_seat: [value() for _ in range(byte())]
+            for hand_seat in SEATS}
+    return board
+
+
+def encode_boards(apps, schema_editor):
+    """Move each room's json board into board_state."""
+    from bfgdealer import Board
+
+    db = schema_editor.connection.alias
+    Room = apps.get_model('common', 'Room')
+    for room in Room.objects.using(db).exclude(board='').iterator():
+        room.board_state = encode_board(Board().from_json(room.board))
+        room.board = ''
+        room.save(update_fields=['board', 'board_state'])
+
+
+def decode_boards(apps, schema_editor):
+    """Move each room's board_state back into the json board."""
+    db = schema_editor.connection.alias
+    Room = apps.get_model('common', 'Room')
+    for room in Room.objects.using(db).exclude(board_state=b'').iterator():
+        if is_encoded(room.board_state):
+            room.board = decode_board(room.board_state).to_json()
+        room.board_state = b''
+        room.save(update_fields=['board', 'board_state'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0017_room_archive_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='board_state',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(encode_boards, decode_boards),
+    ]
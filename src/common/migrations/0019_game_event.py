@@ -0,0 +1,217 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:11
+
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The encoder of common.codec and the replay of common.game_log as they were
+# when this migration was written (CODEC_VERSION 1). They are frozen here so
+# that later changes to the codec or the log do not change what the
+# migration does.
+
+MAGIC = b'BG'
+CODEC_VERSION = 1
+SEATS = ['N', 'E', 'S', 'W']
+SEAT_VALUES = [*SEATS, '', None]
+SEAT_CODES = {seat: index for index, seat in enumerate(SEAT_VALUES)}
+(NONE, FALSE, TRUE, SMALL_INT, INT, STRING) = range(6)
+CALL_ESCAPE = 255
+INDEX_KEYED_HANDS = 1
+HAS_MAKEABLE_TRICKS = 2
+
+
+def is_encoded(data):
+    return isinstance(data, (bytes, memoryview)) and bytes(data[:2]) == MAGIC
+
+
+def encode_board(board):
+    from bridgeobjects import CALLS, CARD_NAMES
+
+    card_index = {name: index for index, name in enumerate(CARD_NAMES)}
+    call_index = {name: index for index, name in enumerate(CALLS)}
+
+    def card_mask(cards):
+        mask = 0
+        for card in cards:
+            mask |= 1 << card_index[card.name]
+        return mask.to_bytes(7, 'big')
+
+    def write_calls(calls):
+        out.append(len(calls))
+        for call in calls:
+            if call in call_index:
+                out.append(call_index[call])
+            else:
+                out.append(CALL_ESCAPE)
+                write_value(call)
+
+    def write_seat(seat):
+        out.append(SEAT_CODES[seat])
+
+    def write_value(value):
+        if value is None:
+            out.append(NONE)
+        elif value is False:
+            out.append(FALSE)
+        elif value is True:
+            out.append(TRUE)
+        elif isinstance(value, int) and -128 <= value < 128:
+            out.append(SMALL_INT)
+            out.extend(struct.pack('>b', value))
+        elif isinstance(value, int):
+            out.append(INT)
+            out.extend(struct.pack('>q', value))
+        else:
+            encoded = value.encode()
+            out.append(STRING)
+            out.extend(struct.pack('>H', len(encoded)))
+            out.extend(encoded)
+
+    out = bytearray(MAGIC)
+    out.append(CODEC_VERSION)
+    flags = 0
+    if 0 in board.hands:
+        flags |= INDEX_KEYED_HANDS
+    if board._makeable_tricks is not None:
+        flags |= HAS_MAKEABLE_TRICKS
+    out.append(flags)
+    for seat in SEATS:
+        out.extend(card_mask(board.hands[seat].cards))
+        out.extend(card_mask(board.hands[seat].unplayed_cards))
+    write_calls(board.bid_history)
+    write_calls([call.name for call in board._auction.calls])
+    write_seat(board._auction.first_caller)
+    write_value(board._contract.name)
+    write_seat(board._contract.declarer)
+    out.append(len(board.tricks))
+    for trick in [*board.tricks, board.current_trick]:
+        write_seat(trick.leader)
+        write_seat(trick.winner)
+        out.append(len(trick.cards))
+        out.extend(card_index[card.name] for card in trick.cards)
+    for seat in (board.current_player, board.declarer, board.dealer):
+        write_seat(seat)
+    for value in (board.warning, board.declarer_index,
+                  board.declarers_tricks, board.dealer_index,
+                  board.description, board.north, board.east, board.south,
+                  board.west, board.NS_tricks, board.EW_tricks, board._stage,
+                  board.source, board.vulnerable, board.identifier):
+        write_value(value)
+    if flags & HAS_MAKEABLE_TRICKS:
+        for seat in SEATS:
+            levels = board._makeable_tricks[seat]
+            out.append(len(levels))
+            for level in levels:
+                write_value(level)
+    return bytes(out)
+
+
+EDIT_HEADER = struct.Struct('>HHH')
+
+
+def apply_patch(state, patch):
+    parts = []
+    (position, offset) = (0, 0)
+    while offset < len(patch):
+        (start, end, length) = EDIT_HEADER.unpack_from(patch, offset)
+        offset += EDIT_HEADER.size
+        parts.append(state[position:start])
+        parts.append(patch[offset:offset + length])
+        offset += length
+        position = end
+    parts.append(state[position:])
+    return b''.join(parts)
+
+
+def replay(rows):
+    """Apply (sequence, patch, state) rows, in order, from the last state."""
+    starts = [index for index, (_, _, state) in enumerate(rows) if state]
+    if not starts:
+        if rows:
+            raise ValueError(f'No full board before event {rows[0][0]}')
+        return None
+    (sequence, _, state) = rows[starts[-1]]
+    state = bytes(state)
+    for next_sequence, patch, _ in rows[starts[-1] + 1:]:
+        if next_sequence != sequence + 1:
+            raise ValueError(f'Event {sequence + 1} is missing')
+        state = apply_patch(state, bytes(patch))
+        sequence = next_sequence
+    return state
+
+
+def log_boards(apps, schema_editor):
+    """Start each room's game log with its current board in full."""
+    from bfgdealer import Board
+
+    db = schema_editor.connection.alias
+    Room = apps.get_model('common', 'Room')
+    GameEvent = apps.get_model('common', 'GameEvent')
+    rooms = Room.objects.using(db).exclude(board='', board_state=b'')
+    for room in rooms.iterator():
+        state = room.board_state
+        if not is_encoded(state):
+            state = encode_board(Board().from_json(room.board))
+        GameEvent.objects.using(db).create(
+            room=room, sequence=room.board_version, kind='state',
+            state=bytes(state))
+        room.board = ''
+        room.board_state = b''
+        room.save(update_fields=['board', 'board_state'])
+
+
+def unlog_boards(apps, schema_editor):
+    """Put each room's latest logged board back into board_state."""
+    db = schema_editor.connection.alias
+    Room = apps.get_model('common', 'Room')
+    GameEvent = apps.get_model('common', 'GameEvent')
+    rooms = Room.objects.using(db).filter(events__isnull=False).distinct()
+    for room in rooms:
+        rows = (GameEvent.objects.using(db)
+                .filter(room=room, sequence__lte=room.board_version)
+                .order_by('sequence')
+                .values_list('sequence', 'patch', 'state'))
+        room.board_state = replay(list(rows)) or b''
+        room.save(update_fields=['board_state'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0018_room_board_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameEvent',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('sequence', models.PositiveIntegerField()),
+                ('kind', models.CharField(max_length=8)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+                ('patch', models.BinaryField(blank=True, default=b'')),
+                ('state', models.BinaryField(blank=True, default=b'')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='events',
+                    to='common.room',
+                )),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('room', 'sequence'),
+                        name='unique_room_event_sequence',
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(log_boards, unlog_boards),
+    ]
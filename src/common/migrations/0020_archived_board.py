@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:14
+
+import json
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# The newest boards kept by the reverse migration, as Room.archive used to
+MAX_ARCHIVE = 25
+
+
+def move_archives(apps, schema_editor):
+    """Turn each room's json list of pbns into rows, keeping their order."""
+    db = schema_editor.connection.alias
+    Room = apps.get_model('common', 'Room')
+    ArchivedBoard = apps.get_model('common', 'ArchivedBoard')
+    now = django.utils.timezone.now()
+    for room in Room.objects.using(db).exclude(archive='').iterator():
+        pbns = json.loads(room.archive)
+        ArchivedBoard.objects.using(db).bulk_create(
+            ArchivedBoard(room=room, pbn=pbn,
+                          created=now - timedelta(microseconds=index))
+            for index, pbn in enumerate(pbns))
+
+
+def restore_archives(apps, schema_editor):
+    """Put each room's newest boards back into Room.archive."""
+    db = schema_editor.connection.alias
+    Room = apps.get_model('common', 'Room')
+    ArchivedBoard = apps.get_model('common', 'ArchivedBoard')
+    rooms = (Room.objects.using(db)
+             .filter(archived_boards__isnull=False).distinct())
+    for room in rooms:
+        pbns = (ArchivedBoard.objects.using(db).filter(room=room)
+                .order_by('-created', '-id')
+                .values_list('pbn', flat=True)[:MAX_ARCHIVE])
+        room.archive = json.dumps(list(pbns))
+        room.save(update_fields=['archive'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0019_game_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBoard',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('pbn', models.TextField()),
+                ('created', models.DateTimeField(
+                    default=django.utils.timezone.now
+                )),
+                ('room', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='archived_boards',
+                    to='common.room',
+                )),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['room', '-created', '-id'],
+                        name='archived_board_room_created',
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(move_archives, restore_archives),
+        migrations.RemoveField(
+            model_name='room',
+            name='archive',
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+# common.archive's get_history_summary as it was when this migration was
+# written, frozen so that later changes to it do not change the migration
+SEATS = ['N', 'E', 'S', 'W']
+SUIT_NAMES = ['C', 'D', 'H', 'S']
+RANKS_HIGH_FIRST = 'AKQJT98765432'
+
+
+def get_history_summary(board):
+    """Return the date and every hand by suit, as shown by get-history."""
+    return {
+        'date': board.description,
+        'hands': {
+            seat: {
+                suit: ''.join(
+                    rank for rank in RANKS_HIGH_FIRST
+                    if any(card.rank == rank and card.suit.name == suit
+                           for card in board.hands[seat].cards))
+                for suit in SUIT_NAMES}
+            for seat in SEATS},
+    }
+
+
+def add_summaries(apps, schema_editor):
+    """Compute the get-history entry of every archived board."""
+    from bfgdealer import Board
+
+    db = schema_editor.connection.alias
+    ArchivedBoard = apps.get_model('common', 'ArchivedBoard')
+    for row in ArchivedBoard.objects.using(db).only('pbn').iterator():
+        board = Board()
+        board.parse_pbn_board(row.pbn.split('\n'))
+        row.summary = get_history_summary(board)
+        row.save(update_fields=['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0020_archived_board'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedboard',
+            name='rotation',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedboard',
+            name='summary',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='archive_rotation',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(add_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0022_room_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoubleDummyTable',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True,
+                    primary_key=True,
+                    serialize=False,
+                    verbose_name='ID',
+                )),
+                ('deal', models.CharField(max_length=80, unique=True)),
+                ('table', models.JSONField()),
+                ('created', models.DateTimeField(
+                    default=django.utils.timezone.now
+                )),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0023_doubledummytable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='dd_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,10 +1,11 @@
 
 import json
 from django.db import models
+from django.utils import timezone
 
 
 class Room(models.Model):
-    name = models.CharField(max_length=180)
+    name = models.CharField(max_length=180, unique=True)
     last_task = models.CharField(max_length=32, blank=True)
     last_data = models.CharField(max_length=64, blank=True)
     board_number = models.IntegerField(default=0)
@@ -17,7 +18,15 @@ class Room(models.Model):
     board_pbn = models.CharField(null=True, blank=True,
                                  max_length=512, default='')
     board = models.TextField(blank=True)
-    archive = models.TextField(blank=True)
+    board_state = models.BinaryField(blank=True, default=b'')
+    board_version = models.PositiveIntegerField(default=0)
+    # Bumped by every write of the row (see common.unit_of_work)
+    version = models.PositiveIntegerField(default=0)
+    archive_version = models.PositiveIntegerField(default=0)
+    # Bumped when a double dummy table the board waits for is stored (see
+    # common.double_dummy); not a write of the room's own state
+    dd_version = models.PositiveIntegerField(default=0)
+    archive_rotation = models.PositiveSmallIntegerField(default=0)
     saved_boards = models.TextField(blank=True, default=json.dumps([]))
     saved_pbn = models.CharField(null=True, blank=True,
                                  max_length=512, default='')
@@ -27,6 +36,59 @@ class Room(models.Model):
 
 
 class User(models.Model):
-    username = models.CharField(max_length=32)
+    username = models.CharField(max_length=32, unique=True)
     logged_in = models.BooleanField(default=False)
     last_activity = models.DateTimeField(null=True)
+
+
+class GameEvent(models.Model):
+    """One change to a room's board; see common.game_log."""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE,
+                             related_name='events')
+    sequence = models.PositiveIntegerField()
+    kind = models.CharField(max_length=8)
+    detail = models.JSONField(default=dict, blank=True)
+    patch = models.BinaryField(blank=True, default=b'')
+    state = models.BinaryField(blank=True, default=b'')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'sequence'],
+                                    name='unique_room_event_sequence'),
+        ]
+
+    def __str__(self):
+        return f'GameEvent({self.room_id} {self.sequence} {self.kind})'
+
+
+class ArchivedBoard(models.Model):
+    """A board played in a room, as pbn; see common.archive."""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE,
+                             related_name='archived_boards')
+    pbn = models.TextField()
+    # The get-history entry for the board, with every seat's hand
+    summary = models.JSONField(default=dict)
+    # Seats to rotate the board by, on top of the room's archive_rotation
+    rotation = models.PositiveSmallIntegerField(default=0)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', '-created', '-id'],
+                         name='archived_board_room_created'),
+        ]
+
+    def __str__(self):
+        return f'ArchivedBoard({self.room_id} {self.created})'
+
+
+class DoubleDummyTable(models.Model):
+    """The makeable tricks of a deal; see common.double_dummy."""
+    # The deal as the solver reads it: "<dealer>:<pbn hands>"
+    deal = models.CharField(max_length=80, unique=True)
+    table = models.JSONField()
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'DoubleDummyTable({self.deal})'
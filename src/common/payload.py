@@ -0,0 +1,65 @@
+"""
+Pre-serialised, pre-compressed json responses.
+
+A Payload holds the json bytes of a response together with gzip and, when
+the optional brotli package is installed, brotli encodings and a strong
+ETag over the json. It is built once and then served as is, so repeated
+requests cost neither serialisation nor compression.
+"""
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# brotli is an optional dependency: pip install bfg_api[brotli]
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IDENTITY = "identity"
+
+
+@dataclass(frozen=True, slots=True)
+class Payload:
+    etag: str
+    encodings: dict[str, bytes]
+
+    @classmethod
+    def from_content(cls, content: object) -> "Payload":
+        body = json.dumps(content, cls=DjangoJSONEncoder).encode()
+        encodings = {"gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            encodings["br"] = brotli.compress(body, quality=11)
+        encodings[IDENTITY] = body
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return cls(etag, encodings)
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Return the best encoding the client accepts."""
+        accepted = {
+            coding
+            for coding, quality in map(_parse, accept_encoding.split(","))
+            if quality > 0
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encodings:
+                return encoding
+        return IDENTITY
+
+
+def _parse(item: str) -> tuple[str, float]:
+    """Return the coding and q-value of an Accept-Encoding item."""
+    coding, *params = item.split(";")
+    quality = 1.0
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+    return coding.strip().lower(), quality
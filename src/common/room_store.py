@@ -0,0 +1,253 @@
+"""
+Where rooms and their archived boards are kept.
+
+Game logic reaches a room's row through a RoomStore rather than the Room
+manager:
+
+    get(name)                             the room, created if need be
+    compare_and_set(room, expected, changes)
+                                          write changes if the stored
+                                          fields still hold expected
+    append_archive(room, archived_board)  add a board to the room's archive
+
+GameRequest.room fetches rooms with room_store.get and the unit of work
+writes dirty rooms and new archived boards through it. Rooms are returned
+as Room instances whichever backend holds them, so callers are unchanged.
+Callers look the store up as common.room_store.room_store each time rather
+than importing it, so that replacing it (as the benchmarks do) changes
+both where rooms are read and where they are written.
+
+There are three backends, chosen by settings.ROOM_STORE_URL:
+
+    ""                DjangoRoomStore  the database, through the ORM
+    "memory://"       MemoryRoomStore  dicts in this process, for tests and
+                                       benchmarks
+    "redis://..."     RedisRoomStore   a json record per room and a list
+                                       per archive, on any client speaking
+                                       the Redis protocol (redis-py's
+                                       Redis, a local redis-server, or a
+                                       fake)
+
+The game log and archive listings are still read through the ORM, and a
+MemoryRoomStore is not shared with the engine pool's workers, so only
+DjangoRoomStore can serve every request today; "python manage.py
+bench_room_store" compares the three.
+"""
+
+import copy
+import itertools
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core import serializers
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+
+from common.models import ArchivedBoard, Room
+
+ROOM_KEY = "bfg:room:{}"
+ROOM_ID_KEY = "bfg:room-id:{}"
+ARCHIVE_KEY = "bfg:archive:{}"
+ROOM_IDS_KEY = "bfg:room-ids"
+
+
+class RoomStore(ABC):
+    """The operations game logic needs on rooms."""
+
+    @abstractmethod
+    def get(self, name: str) -> Room:
+        """Return the room called name, creating it if it does not exist."""
+
+    @abstractmethod
+    def compare_and_set(
+        self,
+        room: Room,
+        expected: dict[str, object],
+        changes: dict[str, object],
+    ) -> bool:
+        """
+        Write changes to room if its stored fields still equal expected.
+
+        Return False, writing nothing, if any of them has changed.
+        """
+
+    @abstractmethod
+    def append_archive(
+        self, room: Room, archived_board: ArchivedBoard
+    ) -> None:
+        """Add archived_board to the room's archive."""
+
+
+class DjangoRoomStore(RoomStore):
+    def __init__(self, database: str = DEFAULT_DB_ALIAS) -> None:
+        self.database = database
+
+    def get(self, name: str) -> Room:
+        # INSERT ... ON CONFLICT DO NOTHING: concurrent first requests for a
+        # name all end up with the one row
+        manager = Room.objects.using(self.database)
+        try:
+            return manager.get(name=name)
+        except Room.DoesNotExist:
+            manager.bulk_create([Room(name=name)], ignore_conflicts=True)
+            return manager.get(name=name)
+
+    def compare_and_set(self, room, expected, changes) -> bool:
+        rows = (
+            Room._base_manager.using(self.database)
+            .filter(pk=room.pk, **expected)
+            .update(**changes)
+        )
+        return rows == 1
+
+    def append_archive(self, room, archived_board) -> None:
+        archived_board.room = room
+        archived_board.save(using=self.database, force_insert=True)
+
+
+class MemoryRoomStore(RoomStore):
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._rooms: dict[int, dict[str, object]] = {}
+        self._archives: dict[int, list[dict[str, object]]] = {}
+        self._next_id = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Room:
+        with self._lock:
+            if name not in self._ids:
+                room = Room(pk=next(self._next_id), name=name)
+                self._ids[name] = room.pk
+                self._rooms[room.pk] = _field_values(room)
+            return Room(**copy.deepcopy(self._rooms[self._ids[name]]))
+
+    def compare_and_set(self, room, expected, changes) -> bool:
+        with self._lock:
+            record = self._rooms[room.pk]
+            if any(
+                record[field] != value for field, value in expected.items()
+            ):
+                return False
+            record.update(copy.deepcopy(changes))
+            return True
+
+    def append_archive(self, room, archived_board) -> None:
+        archived_board.room_id = room.pk
+        with self._lock:
+            archive = self._archives.setdefault(room.pk, [])
+            archive.insert(0, _field_values(archived_board))
+
+    def archive(self, room: Room) -> list[ArchivedBoard]:
+        """Return the room's archived boards, newest first."""
+        with self._lock:
+            records = copy.deepcopy(self._archives.get(room.pk, []))
+        return [ArchivedBoard(**record) for record in records]
+
+
+class RedisRoomStore(RoomStore):
+    """
+    Rooms as json records, compared and set under WATCH.
+
+    client is a redis.Redis (decode_responses must be off) or anything
+    with the same get, set, incr, lpush, lrange and pipeline methods, in
+    which case watch_error is what its pipelines raise in place of redis'
+    WatchError.
+    """
+
+    def __init__(
+        self, client, watch_error: type[Exception] | None = None
+    ) -> None:
+        if watch_error is None:
+            from redis.exceptions import WatchError
+
+            watch_error = WatchError
+        self.client = client
+        self.watch_error = watch_error
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRoomStore":
+        # redis is an optional dependency: pip install bfg_api[redis]
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, name: str) -> Room:
+        id_key = ROOM_ID_KEY.format(name)
+        room_id = self.client.get(id_key)
+        if room_id is None:
+            # SET NX: the first request to claim the name wins, and the
+            # others take its id rather than writing a room of their own
+            self.client.set(id_key, self.client.incr(ROOM_IDS_KEY), nx=True)
+            room_id = self.client.get(id_key)
+        key = ROOM_KEY.format(int(room_id))
+        data = self.client.get(key)
+        if data is None:
+            # Claimed but not yet written, by this request or the one that
+            # won; SET NX again, so that a record written since is kept
+            room = Room(pk=int(room_id), name=name)
+            self.client.set(key, _dump(room), nx=True)
+            data = self.client.get(key)
+        return _load(data)
+
+    def compare_and_set(self, room, expected, changes) -> bool:
+        key = ROOM_KEY.format(room.pk)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    stored = _load(pipe.get(key))
+                    if any(
+                        getattr(stored, field) != value
+                        for field, value in expected.items()
+                    ):
+                        pipe.unwatch()
+                        return False
+                    for field, value in changes.items():
+                        setattr(stored, field, value)
+                    pipe.multi()
+                    pipe.set(key, _dump(stored))
+                    pipe.execute()
+                    return True
+                except self.watch_error:
+                    # Written by someone else since the WATCH: compare again
+                    continue
+
+    def append_archive(self, room, archived_board) -> None:
+        archived_board.room_id = room.pk
+        self.client.lpush(ARCHIVE_KEY.format(room.pk), _dump(archived_board))
+
+    def archive(self, room: Room) -> list[ArchivedBoard]:
+        """Return the room's archived boards, newest first."""
+        records = self.client.lrange(ARCHIVE_KEY.format(room.pk), 0, -1)
+        return [_load(record) for record in records]
+
+
+def _field_values(instance) -> dict[str, object]:
+    return {
+        field.attname: copy.deepcopy(getattr(instance, field.attname))
+        for field in instance._meta.concrete_fields
+    }
+
+
+def _dump(instance) -> bytes:
+    """Serialise a model instance as Django's json fixtures do."""
+    return serializers.serialize("json", [instance]).encode()
+
+
+def _load(data: bytes):
+    return next(serializers.deserialize("json", data)).object
+
+
+def store_from_url(url: str) -> RoomStore:
+    """Return the store a ROOM_STORE_URL names."""
+    if not url:
+        return DjangoRoomStore()
+    if url == "memory://":
+        return MemoryRoomStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRoomStore.from_url(url)
+    raise ImproperlyConfigured(f"Unknown ROOM_STORE_URL: {url}")
+
+
+room_store: RoomStore = store_from_url(getattr(settings, "ROOM_STORE_URL", ""))
@@ -0,0 +1,89 @@
+"""
+Board contexts already sent to clients, for delta responses.
+
+Every board context carries the room's board_version as state_version. A
+client that sends it back as since_version gets only the keys whose values
+changed since that version, plus state_version and delta=True. If the
+worker no longer holds that snapshot (another worker served it, it was
+evicted, or the mode differs) the full context is returned with
+delta=False, so a client can always apply a response by updating its state
+with every key it contains.
+
+A few versions are kept per room, because in duo both players' clients ask
+for deltas and they may be at different versions.
+
+A context can change without its version: makeable_tricks is None until
+the deal's double dummy table is ready (see common.double_dummy). So the
+first context stored for a version is kept, and deltas are taken from it;
+every client at that version is then sent the table, whichever of the
+contexts it was given.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from common.constants import SNAPSHOT_MAX_ROOMS, SNAPSHOT_VERSIONS_PER_ROOM
+
+
+class SnapshotCache:
+    """The last few board contexts of each room, by version and mode."""
+
+    def __init__(self, max_rooms: int, versions_per_room: int) -> None:
+        self.max_rooms = max_rooms
+        self.versions_per_room = versions_per_room
+        self._rooms: OrderedDict[int, OrderedDict[tuple, dict]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, room_id: int, version: int, mode: str) -> dict | None:
+        with self._lock:
+            versions = self._rooms.get(room_id)
+            if versions is None:
+                return None
+            return versions.get((version, mode))
+
+    def put(
+        self, room_id: int, version: int, mode: str, context: dict
+    ) -> None:
+        # Deep copied: values such as bid_history are the board's own lists,
+        # which later requests mutate
+        self.store(room_id, version, mode, copy.deepcopy(context))
+
+    def store(
+        self, room_id: int, version: int, mode: str, snapshot: dict
+    ) -> None:
+        """Keep snapshot, a context that nothing else holds, as put does."""
+        with self._lock:
+            versions = self._rooms.pop(room_id, None) or OrderedDict()
+            first = versions.pop((version, mode), None)
+            if first is not None and first.keys() == snapshot.keys():
+                snapshot = first
+            versions[(version, mode)] = snapshot
+            while len(versions) > self.versions_per_room:
+                versions.popitem(last=False)
+            self._rooms[room_id] = versions
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rooms.clear()
+
+
+def context_delta(old: dict, new: dict) -> dict | None:
+    """Return the keys of new that differ from old, or None if not a delta."""
+    if old.keys() != new.keys():
+        return None
+    return {key: value for key, value in new.items() if old[key] != value}
+
+
+snapshot_cache = SnapshotCache(SNAPSHOT_MAX_ROOMS, SNAPSHOT_VERSIONS_PER_ROOM)
+
+
+def store_snapshot(
+    room_id: int, version: int, mode: str, snapshot: dict
+) -> None:
+    """snapshot_cache.store, as a function after_flush partials can pickle."""
+    snapshot_cache.store(room_id, version, mode, snapshot)
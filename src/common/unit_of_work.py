@@ -0,0 +1,270 @@
+"""
+Request-scoped unit of work for Room and User persistence.
+
+A single request used to save the same Room several times, each time
+rewriting every column including the large board and archive fields. Code
+now calls save_fields(instance, *fields) instead of instance.save(). Inside
+a unit of work this only records which fields are dirty; the unit flushes
+once, in one transaction, with a single UPDATE per row that touches only
+those fields. Outside a unit of work save_fields writes immediately. Rows
+added with save_new are inserted in the same transaction.
+
+A unit of work that exits with an exception is discarded, so a failed
+request no longer leaves a partially updated room behind.
+
+A unit opened with flush=False is never written by the process that filled
+it. The engine pool uses this: a worker process runs the action on a copy of
+the room and returns unit.changes(), which the web process writes with
+UnitOfWork.from_changes(changes).flush().
+
+Rooms and archived boards are written through common.room_store: a dirty
+Room with room_store.compare_and_set and a new ArchivedBoard with
+room_store.append_archive.
+
+In duo both partners post to the same room, so two requests can read the
+same row and both write it. Room.version is the row's version: a room is
+only written if its stored version is still the one the request read, and
+the write bumps it. Otherwise flush raises StaleRoomError and writes
+nothing; run_in_unit_of_work runs the request again on the fresh row, and
+the views answer 409 if it still conflicts. Nothing is locked while the
+engines run, and requests to different rooms never wait for each other.
+
+Work that must only happen once the writes are committed, such as putting
+a board in the board cache, is registered with after_flush. A unit opened
+with flush=False hands these calls on with its changes: the engine pool
+returns unit.after_flush_calls() from the worker, and the web process runs
+them once UnitOfWork.from_changes(changes, calls) is flushed. They are
+pickled on the way, so they are partials of module-level functions (such
+as common.board_cache.cache_board), not of bound methods.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.db import models, transaction
+
+from common.constants import ROOM_WRITE_ATTEMPTS
+from common.lazy import LazyModule
+
+# Imported on first flush: it imports the models
+stores = LazyModule("common.room_store")
+
+ROOM = "common.Room"
+ARCHIVED_BOARD = "common.ArchivedBoard"
+
+
+class StaleRoomError(Exception):
+    """Raised by flush when a room has been written since it was read."""
+
+
+class UnitOfWork:
+    """Collect dirty model fields and write them in one go."""
+
+    def __init__(self) -> None:
+        # (model, pk) -> {field name: instance holding its latest value}
+        self._dirty: dict[tuple[type, object], dict[str, models.Model]] = {}
+        self._new: list[models.Model] = []
+        self._after_flush: list[Callable[[], None]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._dirty or self._new)
+
+    def register(self, instance: models.Model, fields: tuple[str]) -> None:
+        if instance.pk is None:
+            instance.save()
+            return
+        dirty = self._dirty.setdefault((type(instance), instance.pk), {})
+        for field in fields:
+            dirty[field] = instance
+
+    def add(self, instance: models.Model) -> None:
+        self._new.append(instance)
+
+    def after_flush(self, callback: Callable[[], None]) -> None:
+        self._after_flush.append(callback)
+
+    def after_flush_calls(self) -> list[Callable[[], None]]:
+        """Return the calls to make once the unit is written."""
+        return list(self._after_flush)
+
+    def dirty_fields(self, instance: models.Model) -> set[str]:
+        return set(self._dirty.get((type(instance), instance.pk), {}))
+
+    def changes(self) -> list[tuple[str, object, dict[str, object]]]:
+        """
+        Return the dirty values as picklable (model label, pk, values).
+
+        Rows to be inserted have a pk of None. A room's values include the
+        version it was read at.
+        """
+        changes = []
+        for (model, pk), fields in self._dirty.items():
+            values = {
+                field: getattr(instance, field)
+                for field, instance in fields.items()
+            }
+            if model._meta.label == ROOM:
+                values["version"] = next(iter(fields.values())).version
+            changes.append((model._meta.label, pk, values))
+        for instance in self._new:
+            values = {
+                field.attname: getattr(instance, field.attname)
+                for field in instance._meta.concrete_fields
+                if not field.primary_key
+            }
+            changes.append((instance._meta.label, None, values))
+        return changes
+
+    @classmethod
+    def from_changes(
+        cls,
+        changes: list[tuple[str, object, dict[str, object]]],
+        after_flush_calls: Iterable[Callable[[], None]] = (),
+    ) -> "UnitOfWork":
+        """Return a unit holding changes made by another process."""
+        unit = cls()
+        unit._after_flush.extend(after_flush_calls)
+        for label, pk, values in changes:
+            instance = apps.get_model(label)(pk=pk, **values)
+            if pk is None:
+                unit.add(instance)
+            else:
+                unit.register(instance, tuple(values))
+        return unit
+
+    def flush(self) -> None:
+        """
+        Write the unit in one transaction, then run its after_flush calls.
+
+        Raise StaleRoomError, writing nothing, if a dirty room's version
+        has moved on since it was read.
+        """
+        rooms = []
+        if self:
+            with transaction.atomic():
+                for (model, pk), fields in self._dirty.items():
+                    values = {
+                        field: getattr(instance, field)
+                        for field, instance in fields.items()
+                    }
+                    if model._meta.label == ROOM:
+                        rooms.append(_write_room(fields.values(), values))
+                    else:
+                        model._base_manager.filter(pk=pk).update(**values)
+                for instance in self._new:
+                    if instance._meta.label == ARCHIVED_BOARD:
+                        stores.room_store.append_archive(
+                            instance.room, instance
+                        )
+                    else:
+                        instance.save(force_insert=True)
+        for instances in rooms:
+            for instance in instances:
+                instance.version += 1
+        callbacks = self._after_flush
+        self._dirty = {}
+        self._new = []
+        self._after_flush = []
+        for callback in callbacks:
+            callback()
+
+
+def _write_room(
+    instances: Iterable[models.Model], values: dict[str, object]
+) -> list[models.Model]:
+    """Compare and set a room's values; return the instances written."""
+    # Model instances compare equal by pk, so not a set
+    instances = list({id(room): room for room in instances}.values())
+    # Any of the instances will do: they were all read at the same version
+    room = instances[0]
+    values["version"] = room.version + 1
+    if not stores.room_store.compare_and_set(
+        room, {"version": room.version}, values
+    ):
+        raise StaleRoomError(
+            f"Room {room.pk} has been written since version {room.version}"
+        )
+    return instances
+
+
+_current_unit: ContextVar[UnitOfWork | None] = ContextVar(
+    "unit_of_work", default=None
+)
+
+
+@contextmanager
+def unit_of_work(flush: bool = True) -> Iterator[UnitOfWork]:
+    """
+    Open a unit of work, flushing it on a clean exit unless flush is False.
+
+    Nested units join the outermost one, which does the only flush.
+    """
+    unit = _current_unit.get()
+    if unit is not None:
+        yield unit
+        return
+
+    unit = UnitOfWork()
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+        if flush:
+            unit.flush()
+    finally:
+        _current_unit.reset(token)
+
+
+def current_unit() -> UnitOfWork | None:
+    return _current_unit.get()
+
+
+def save_fields(instance: models.Model, *fields: str) -> None:
+    """Persist fields of instance now, or at the end of the unit of work."""
+    unit = _current_unit.get()
+    if unit is None:
+        # A unit of its own, so that a room's version is still checked
+        unit = UnitOfWork()
+        unit.register(instance, fields)
+        unit.flush()
+        return
+    unit.register(instance, fields)
+
+
+def save_new(instance: models.Model) -> None:
+    """Insert instance now, or at the end of the unit of work."""
+    unit = _current_unit.get()
+    if unit is None:
+        instance.save(force_insert=True)
+        return
+    unit.add(instance)
+
+
+def after_flush(callback: Callable[[], None]) -> None:
+    """Call callback once the unit of work is written, or now outside one."""
+    unit = _current_unit.get()
+    if unit is None:
+        callback()
+        return
+    unit.after_flush(callback)
+
+
+def run_in_unit_of_work(
+    func: Callable[[], object], attempts: int = ROOM_WRITE_ATTEMPTS
+) -> object:
+    """
+    Return func() run in a unit of work, run again if its room went stale.
+
+    Raise StaleRoomError if every attempt conflicts. Inside another unit of
+    work func is run once, as it is the outer unit that flushes.
+    """
+    if _current_unit.get() is not None:
+        attempts = 1
+    for attempt in range(1, attempts + 1):
+        try:
+            with unit_of_work():
+                return func()
+        except StaleRoomError:
+            if attempt == attempts:
+                raise
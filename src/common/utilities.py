@@ -1,14 +1,35 @@
 """Helper classes for BfG."""
 
+import hashlib
 import json
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
-from typing import Any
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
-from bfgdealer import Board
+from asgiref.sync import sync_to_async
 from bridgeobjects import SEATS, Call, Denomination, Trick
 
+from common import game_log
+from common import room_store as stores
+from common.activity import activity_buffer
+from common.board_cache import (
+    board_cache,
+    cache_board,
+    link_players_to_hands,
+)
+from common.codec import decode_board, encode_board, is_encoded
+from common.lazy import LazyModule
+from common.metrics import BOARD, timed
 from common.models import Room, User
+from common.unit_of_work import after_flush, save_fields
+
+if TYPE_CHECKING:
+    from bfgdealer import Board
+
+dealer = LazyModule("bfgdealer")
+
+# Response keys sent whatever fields a request selects
+ALWAYS_SENT = frozenset({"state_version", "delta", "error"})
 
 
 @dataclass(slots=True)
@@ -18,7 +39,6 @@ class GameRequest:
     board_id: str = ""
     seat: str = "N"
     room_name: str = ""
-    room: Room | None = None
     bid: str = ""
     generate_contract: bool = False
     set_hands: list = field(default_factory=list)
@@ -43,8 +63,14 @@ class GameRequest:
     message: dict[str, Any] = field(default_factory=dict)
     payload: dict[str, Any] = field(default_factory=dict)
     user_query: str = ""
+    since_version: int = 0
+    history_cursor: str = ""
+    # The response keys the client wants; empty for all of them
+    fields: frozenset[str] = frozenset()
+    needs_room: bool = True
 
     seat_index: int = field(init=False)
+    _room: Room | None = field(init=False, default=None, repr=False)
 
     def __post_init__(self) -> None:
         if self.seat not in SEATS:
@@ -58,20 +84,57 @@ class GameRequest:
         self._update_user_activity()
 
     def _update_user_activity(self) -> None:
-        user = get_user_from_username(self.username)
-        user.last_activity = datetime.now().replace(tzinfo=timezone.utc)
-        user.save()
+        activity_buffer.touch(self.username)
+
+    @property
+    def room(self) -> Room:
+        """Return the request's room, fetching or creating it on first use."""
+        if self._room is None:
+            self._check_room_wanted()
+            self._room = _get_room_from_name(self.room_name)
+        return self._room
+
+    async def aroom(self) -> Room:
+        """Return the request's room, as room does, from a worker thread."""
+        if self._room is None:
+            self._check_room_wanted()
+            self._room = await sync_to_async(_get_room_from_name)(
+                self.room_name
+            )
+        return self._room
+
+    @room.setter
+    def room(self, value: Room) -> None:
+        self._room = value
+
+    def _check_room_wanted(self) -> None:
+        if not self.needs_room:
+            raise RuntimeError("Request declared it needs no room")
+        if not self.room_name:
+            raise ValueError("Missing room_name")
 
+    def wants(self, key: str) -> bool:
+        """Return True if key is to be computed for the response."""
+        return not self.fields or key in self.fields
 
-def req_from_json(raw_params: str) -> GameRequest:
-    data = json.loads(raw_params)
+
+def room_not_required(func):
+    """Declare that an action never touches the request's room."""
+    func.needs_room = False
+    return func
+
+
+def req_from_json(raw_params: str, needs_room: bool = True) -> GameRequest:
+    return req_from_dict(json.loads(raw_params), needs_room)
+
+
+def req_from_dict(data: dict, needs_room: bool = True) -> GameRequest:
     return GameRequest(
         username=data.get("username", ""),
         partner_username=data.get("partner_username", ""),
         board_id=data.get("board_id", ""),
         seat=data.get("seat", "N"),
         room_name=data.get("room_name", ""),
-        room=_get_room_from_name(data.get("room_name", "")),
         bid=data.get("bid", ""),
         generate_contract=bool(data.get("generate_contract", False)),
         set_hands=data.get("set_hands", []),
@@ -96,9 +159,24 @@ def req_from_json(raw_params: str) -> GameRequest:
         message=data.get("message", {}),
         payload=data.get("payload", {}),
         user_query=data.get("user_query", ""),
+        since_version=int(data.get("since_version", 0)),
+        history_cursor=data.get("history_cursor", ""),
+        fields=frozenset(data.get("fields", ())),
+        needs_room=needs_room,
     )
 
 
+def select_fields(req: GameRequest, response: object) -> object:
+    """Return response with only the keys the request asked for."""
+    if not req.fields or not isinstance(response, dict):
+        return response
+    return {
+        key: value
+        for key, value in response.items()
+        if key in req.fields or key in ALWAYS_SENT
+    }
+
+
 class UserProxy:
     def __init__(self, username=None, seat=None, room_name=None):
         self.pk = username
@@ -113,12 +191,55 @@ class UserProxy:
         return str(self.__dict__)
 
 
+def room_state_etag(room_name: str, *parts: object) -> str | None:
+    """
+    Return an ETag for the state of a room, or None if it does not exist.
+
+    It covers the board, archive and double dummy table versions and the
+    given parts (the endpoint and the request body), and costs one
+    values-only query.
+    """
+    versions = (
+        Room.objects.filter(name=room_name)
+        .values_list("board_version", "archive_version", "dd_version")
+        .first()
+    )
+    if versions is None:
+        return None
+    return _state_etag(versions, parts)
+
+
+def room_etag(room: Room, *parts: object) -> str:
+    """Return room_state_etag's ETag for a room as it was read or written."""
+    versions = (room.board_version, room.archive_version, room.dd_version)
+    return _state_etag(versions, parts)
+
+
+def _state_etag(versions: tuple[int, int, int], parts: tuple) -> str:
+    digest = hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+    return f'"{versions[0]}-{versions[1]}-{versions[2]}-{digest}"'
+
+
 def _get_room_from_name(name: str) -> Room:
-    return Room.objects.get_or_create(name=name)[0]
+    return stores.room_store.get(name)
 
 
 def get_user_from_username(username: str) -> User:
-    return User.objects.get_or_create(username=username)[0]
+    return _get_or_insert(User, username=username)
+
+
+def _get_or_insert(model: type, **lookup) -> object:
+    """
+    Return the row matching a unique lookup, creating it if necessary.
+
+    The insert is INSERT ... ON CONFLICT DO NOTHING, so concurrent first
+    requests for the same name all end up with the one row.
+    """
+    try:
+        return model.objects.get(**lookup)
+    except model.DoesNotExist:
+        model.objects.bulk_create([model(**lookup)], ignore_conflicts=True)
+        return model.objects.get(**lookup)
 
 
 def update_user_activity(req: GameRequest) -> None:
@@ -147,20 +268,70 @@ def passed_out(bid_history: list[str]) -> bool:  # X
     )
 
 
-def save_board(room: Room, board: Board) -> None:
+@timed(BOARD)
+def load_board(room: Room) -> "Board":
+    """
+    Return the room's board, from the board cache if it is current.
+
+    Otherwise the board is rebuilt from the game log. The encoded board is
+    kept on the room as room.board_head, for save_board to diff against.
+    A board saved earlier in the same unit of work is not in the cache or
+    the log yet, and is taken from room.saved_board.
+    """
+    board = getattr(room, "saved_board", None)
+    if board is not None:
+        room.saved_board = None
+        return board
+    entry = board_cache.take_entry(room.pk, room.board_version)
+    if entry is not None:
+        room.board_head = entry.state
+        return entry.board
+    state = game_log.board_state_at(room)
+    if state is not None:
+        room.board_head = state
+        return decode_board(state)
+    # A room that has never been logged: its next event holds the whole board
+    room.board_head = None
+    if is_encoded(room.board_state):
+        return decode_board(room.board_state)
+    return dealer.Board().from_json(room.board)
+
+
+@timed(BOARD)
+def save_board(room: Room, board: "Board") -> None:
+    """Log the board's change since it was loaded as a new board_version."""
     get_unplayed_cards_for_board_hands(board)
-    room.board = board.to_json()
-    room.save()
+    board_state = encode_board(board)
+    board_head = getattr(room, "board_head", None)
+    if board_state != board_head:
+        room.board_version += 1
+        game_log.append_event(room, board_head, board_state)
+        save_fields(room, "board_version")
+        room.board_head = board_state
+    link_players_to_hands(board)
+    room.saved_board = board
+    # Not before the room is written: a request that loses a race with its
+    # partner's must not leave its board in the cache under their version
+    after_flush(
+        partial(
+            cache_board,
+            room.pk,
+            room.board_version,
+            board,
+            len(board_state),
+            board_state,
+        )
+    )
 
 
-def get_unplayed_cards_for_board_hands(board: Board) -> None:
+def get_unplayed_cards_for_board_hands(board: "Board") -> None:
     if _unplayed_cards_have_not_been_generated(board):
         for key, hand in board.hands.items():
             if not hand.unplayed_cards:
                 hand.unplayed_cards = list(hand.cards)
 
 
-def _unplayed_cards_have_not_been_generated(board: Board) -> bool:
+def _unplayed_cards_have_not_been_generated(board: "Board") -> bool:
     return not any(hand.unplayed_cards for hand in board.hands.values())
 
 
@@ -183,13 +354,13 @@ def get_current_player(trick: Trick) -> str:
     return SEATS[current_player]
 
 
-def get_bidding_data(board: Board) -> tuple[str]:
+def get_bidding_data(board: "Board") -> tuple[str]:
     """Return levels and denoms to disable bid box buttons."""
     call = _get_last_call(board)
     return _get_suppress_list(board) if call else {}
 
 
-def _get_suppress_list(board: Board) -> tuple:
+def _get_suppress_list(board: "Board") -> tuple:
     call = _get_last_call(board)
 
     denoms = []
@@ -216,7 +387,7 @@ def _get_suppress_list(board: Board) -> tuple:
     }
 
 
-def _get_last_call(board: Board) -> str:
+def _get_last_call(board: "Board") -> str:
     for call in reversed(board.bid_history):
         if Call(call).is_value_call:
             return call
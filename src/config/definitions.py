@@ -33,6 +33,7 @@ def get_installed_apps():
 
 def get_middleware():
     return [
+        "common.middleware.metrics.MetricsMiddleware",  # Times all below
         "corsheaders.middleware.CorsMiddleware",  # Must be as high as possible
         "common.middleware.cors.BfgCorsMiddleware",
         "django.middleware.security.SecurityMiddleware",
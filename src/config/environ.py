@@ -33,6 +33,21 @@ def app_log_to_console(debug: bool = False):
     )
 
 
+def engine_pool_size():
+    """Number of engine worker processes used by the async views."""
+    return int(os.getenv("ENGINE_POOL_SIZE", os.cpu_count() or 1))
+
+
+def engine_queue_depth():
+    """Engine calls that may wait for a free worker before we return 503."""
+    return int(os.getenv("ENGINE_QUEUE_DEPTH", 16))
+
+
+def room_store_url():
+    """Where rooms are kept: "" for the database, memory:// or redis://."""
+    return os.getenv("ROOM_STORE_URL", "")
+
+
 def active_log_modules():
     return os.getenv("ACTIVE_LOG_MODULES", "").split(",")
 
@@ -31,7 +31,10 @@ from .definitions import (
 from .environ import (
     active_log_modules,
     app_log_to_console,
+    engine_pool_size,
+    engine_queue_depth,
     get_debug_state,
+    room_store_url,
     set_secret_key,
     set_thread_env_vars,
 )
@@ -82,9 +85,17 @@ ROOT_URLCONF = "config.urls"
 TEMPLATES = get_templates(BASE_DIR)
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# Process pool for the bridge engines, used by the async views
+ENGINE_POOL_SIZE = engine_pool_size()
+ENGINE_QUEUE_DEPTH = engine_queue_depth()
 
 DATABASES = get_databases(BASE_DIR)
 
+# Backend for common.room_store (see its docstring); the database if empty
+ROOM_STORE_URL = room_store_url()
+
 AUTH_PASSWORD_VALIDATORS = get_auth_password_validators()
 
 
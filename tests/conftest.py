@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+
+def pytest_configure():
+    # Load the app registry for the tests that use models. django.setup()
+    # would also open the log file, which is relative to the server's cwd
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "tests")
+
+    from django.apps import apps
+    from django.conf import settings
+
+    apps.populate(settings.INSTALLED_APPS)
+
+
+@pytest.fixture(scope="session")
+def test_databases():
+    """Create the test databases, as manage.py test would, once a run."""
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(config, verbosity=0)
+    teardown_test_environment()
+
+
+@pytest.fixture
+def db(test_databases):
+    """Run the test in a transaction that is rolled back afterwards."""
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
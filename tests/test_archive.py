@@ -0,0 +1,124 @@
+import pytest
+from bfgdealer import DealerDuo
+from bridgeobjects import SEATS
+from django.utils import timezone
+
+from common import archive
+from common.archive import (
+    _get_board_from_pbn,
+    _rotate_board,
+    get_board_from_archive,
+    get_history_boards_text,
+    get_history_summary,
+    get_pbn_string,
+    rotate_archived_boards,
+    save_board_to_archive,
+)
+from common.models import ArchivedBoard, Room
+from common.utilities import GameRequest
+
+BOARDS = 7
+PAGE_SIZE = 3
+
+
+@pytest.fixture
+def boards(db, monkeypatch):
+    """Archive BOARDS boards in room r1 and return them newest first."""
+    monkeypatch.setattr(archive, "HISTORY_PAGE_SIZE", PAGE_SIZE)
+    room = Room.objects.create(name="r1")
+    boards = []
+    for _ in range(BOARDS):
+        board = DealerDuo().deal_random_board()
+        save_board_to_archive(room, board)
+        boards.insert(0, board)
+    # Boards archived in the same instant are kept in order by id
+    ArchivedBoard.objects.filter(room=room).update(created=timezone.now())
+    return boards
+
+
+def _hands(board) -> dict[str, object]:
+    return get_history_summary(board)["hands"]
+
+
+def test_history_pages_follow_the_cursor(boards):
+    req = GameRequest(room_name="r1")
+    pages = []
+    while True:
+        page = get_history_boards_text(req)
+        pages.append(page["boards"])
+        if not page["next_cursor"]:
+            break
+        req.history_cursor = page["next_cursor"]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    listed = [board for page in pages for board in page]
+    assert [board["identifier"] for board in listed] == list(
+        range(1, BOARDS + 1)
+    )
+    assert [board["hands"]["N"] for board in listed] == [
+        _hands(board)["N"] for board in boards
+    ]
+
+
+def test_next_cursor_continues_after_the_page(boards):
+    page = get_history_boards_text(GameRequest(room_name="r1"))
+    last = ArchivedBoard.objects.order_by("-created", "-id")[PAGE_SIZE - 1]
+    assert page["next_cursor"] == (
+        f"{PAGE_SIZE}|{last.created.isoformat()}|{last.pk}"
+    )
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["x", "3|4", "3|not a date|4", "three|2026-10-17T00:00:00+00:00|4"],
+)
+def test_a_malformed_cursor_gives_the_first_page(boards, cursor):
+    req = GameRequest(room_name="r1", history_cursor=cursor)
+    page = get_history_boards_text(req)
+    assert [board["identifier"] for board in page["boards"]] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("position", [1, PAGE_SIZE + 1, BOARDS])
+def test_board_from_archive_at_position(boards, position):
+    req = GameRequest(room_name="r1", board_id=str(position))
+    board = get_board_from_archive(req)
+    assert _hands(board) == _hands(boards[position - 1])
+    assert board.dealer == boards[position - 1].dealer
+
+
+def _rotated_as_before(pbns: list[str], rotation_seat: str) -> list[str]:
+    """Rotate every pbn, as rotate_archived_boards used to."""
+    rotated = []
+    for pbn in pbns:
+        board = _get_board_from_pbn(pbn)
+        _rotate_board(board, SEATS.index(rotation_seat))
+        rotated.append(get_pbn_string(board))
+    return rotated
+
+
+def test_rotation_matches_rotating_every_pbn(db):
+    Room.objects.create(name="r1")
+    # Newest first, as the archive lists them
+    pbns = []
+    for step in ["deal", "deal", "E", "deal", "S", "W", "deal", "E"]:
+        if step == "deal":
+            board = DealerDuo().deal_random_board()
+            save_board_to_archive(Room.objects.get(name="r1"), board)
+            pbns.insert(0, get_pbn_string(board))
+        else:
+            rotate_archived_boards(
+                GameRequest(room_name="r1", rotation_seat=step)
+            )
+            pbns = _rotated_as_before(pbns, step)
+
+    expected = [_get_board_from_pbn(pbn) for pbn in pbns]
+    listed = get_history_boards_text(GameRequest(room_name="r1"))["boards"]
+    for board, entry in zip(expected, listed, strict=True):
+        assert entry["hands"] == {
+            seat: _hands(board)[seat] for seat in "NS"
+        }
+    for position, board in enumerate(expected, start=1):
+        req = GameRequest(room_name="r1", board_id=str(position))
+        restored = get_board_from_archive(req)
+        assert _hands(restored) == _hands(board)
+        assert restored.dealer == board.dealer
+        assert restored.vulnerable == board.vulnerable
@@ -0,0 +1,38 @@
+from bfgdealer import Board
+
+from common.board_cache import BoardCache
+
+
+def test_take_returns_board_at_version():
+    cache = BoardCache(max_entries=4, max_bytes=1000)
+    board = Board()
+    cache.put(1, 3, board, 10)
+    assert cache.take(1, 3) is board
+    assert cache.take(1, 3) is None
+
+
+def test_take_misses_on_stale_version():
+    cache = BoardCache(max_entries=4, max_bytes=1000)
+    cache.put(1, 3, Board(), 10)
+    assert cache.take(1, 4) is None
+    assert len(cache) == 0
+    assert cache.hit_rate == 0.0
+
+
+def test_evicts_least_recently_used_entry():
+    cache = BoardCache(max_entries=2, max_bytes=1000)
+    cache.put(1, 1, Board(), 10)
+    cache.put(2, 1, Board(), 10)
+    cache.put(3, 1, Board(), 10)
+    assert cache.take(1, 1) is None
+    assert cache.take(3, 1) is not None
+
+
+def test_evicts_on_size():
+    cache = BoardCache(max_entries=10, max_bytes=25)
+    cache.put(1, 1, Board(), 10)
+    cache.put(2, 1, Board(), 10)
+    cache.put(3, 1, Board(), 10)
+    assert len(cache) == 2
+    cache.put(4, 1, Board(), 100)
+    assert cache.take(4, 1) is None
@@ -0,0 +1,57 @@
+import pytest
+from bfgdealer import DealerDuo
+
+from common.codec import CodecError, decode_board, encode_board, is_encoded
+
+
+def _dealt_board():
+    board = DealerDuo().deal_random_board()
+    for hand in board.hands.values():
+        hand.unplayed_cards = list(hand.cards)
+    board.bid_history = ["1NT", "P", "3NT", "P", "P", "P"]
+    return board
+
+
+def _card_names(cards):
+    return sorted(card.name for card in cards)
+
+
+def test_round_trip_keeps_the_deal_and_auction():
+    board = _dealt_board()
+    decoded = decode_board(encode_board(board))
+    for seat in "NESW":
+        assert _card_names(decoded.hands[seat].cards) == _card_names(
+            board.hands[seat].cards
+        )
+        assert decoded.players[seat].hand is decoded.hands[seat]
+    assert decoded.bid_history == board.bid_history
+    assert decoded.dealer == board.dealer
+    assert decoded.vulnerable == board.vulnerable
+
+
+def test_decoded_board_encodes_to_the_same_state():
+    # The first decode normalises what Board.from_json would, e.g. tricks
+    state = encode_board(decode_board(encode_board(_dealt_board())))
+    assert encode_board(decode_board(state)) == state
+
+
+def test_unplayed_cards_are_kept_apart_from_the_deal():
+    board = _dealt_board()
+    hand = board.hands["N"]
+    hand.unplayed_cards = hand.unplayed_cards[1:]
+    decoded = decode_board(encode_board(board))
+    assert len(decoded.hands["N"].cards) == 13
+    assert _card_names(decoded.hands["N"].unplayed_cards) == _card_names(
+        hand.unplayed_cards
+    )
+
+
+def test_json_is_not_encoded():
+    assert is_encoded(encode_board(_dealt_board()))
+    assert not is_encoded(b"")
+    assert not is_encoded('{"hands": {}}')
+
+
+def test_truncated_state_is_rejected():
+    with pytest.raises(CodecError):
+        decode_board(encode_board(_dealt_board())[:40])
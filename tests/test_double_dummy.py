@@ -0,0 +1,67 @@
+from bfgdealer import DealerDuo, Trick
+from bridgeobjects import SEATS, Contract
+
+from common import double_dummy
+from common.double_dummy import (
+    SolutionCache,
+    board_position,
+    deal_key,
+    makeable_tricks,
+    next_card,
+    solve,
+    solve_position,
+)
+
+
+def test_solve_matches_the_board():
+    board = DealerDuo().deal_random_board()
+    assert solve(deal_key(board)) == board.makeable_tricks
+
+
+def test_a_board_keeps_its_own_table():
+    board = DealerDuo().deal_random_board()
+    board._makeable_tricks = {"N": ["7", "7", "5", "6", "9"]}
+    assert makeable_tricks(board, None) is board._makeable_tricks
+
+
+def test_solution_cache_evicts_the_least_recently_used():
+    cache = SolutionCache(max_entries=2)
+    cache.put(("S", "N", (), ()), {"AS": 3})
+    cache.put(("H", "N", (), ()), {"AH": 2})
+    assert cache.get(("S", "N", (), ())) == {"AS": 3}
+    cache.put(("D", "N", (), ()), {"AD": 1})
+    assert cache.get(("H", "N", (), ())) is None
+    assert cache.hit_rate == 0.5
+    assert 'bfg_dd_solutions_total{result="hit"} 1' in cache.render()
+
+
+def test_a_whole_hand_plays_double_dummy():
+    board = DealerDuo().deal_random_board()
+    board.contract = Contract("3NT", "N")
+    for hand in board.hands.values():
+        hand.unplayed_cards = list(hand.cards)
+    board.tricks = [board.setup_first_trick_for_board()]
+    for _ in range(52):
+        trick = board.tricks[-1]
+        card = next_card(board, use_double_dummy=True)
+        trick.cards.append(card)
+        board.hands[board.current_player].unplayed_cards.remove(card)
+        if len(trick.cards) < 4:
+            seat = SEATS.index(board.current_player)
+            board.current_player = SEATS[(seat + 1) % 4]
+            continue
+        trick.complete(board.contract.denomination)
+        board.current_player = trick.winner
+        board.tricks.append(Trick(leader=trick.winner))
+    assert len(board.tricks) == 14
+    assert board_position(board) is None
+    assert not next_card(board, use_double_dummy=True)
+
+
+def test_a_busy_solver_leaves_the_position_unsolved():
+    board = DealerDuo().deal_random_board()
+    board.contract = Contract("4S", "S")
+    board.tricks = [board.setup_first_trick_for_board()]
+    with double_dummy._solver_lock:
+        assert solve_position(board) is None
+    assert solve_position(board)
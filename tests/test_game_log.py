@@ -0,0 +1,83 @@
+import pytest
+from bfgdealer import DealerDuo
+from bridgeobjects import Card
+
+from common.codec import encode_board
+from common.game_log import (
+    CALL,
+    CARD,
+    DEAL,
+    UNDO,
+    GameLogError,
+    apply_patch,
+    describe_change,
+    make_patch,
+    replay,
+)
+
+
+def _dealt_board():
+    board = DealerDuo().deal_random_board()
+    for hand in board.hands.values():
+        hand.unplayed_cards = list(hand.cards)
+    return board
+
+
+def _play(board, seat):
+    hand = board.hands[seat]
+    card = hand.unplayed_cards.pop()
+    board.tricks[-1].cards.append(Card(card.name))
+    return card.name
+
+
+def _states():
+    board = _dealt_board()
+    states = [encode_board(board)]
+    board.bid_history = ["1NT", "P", "3NT", "P", "P", "P"]
+    states.append(encode_board(board))
+    board.tricks[-1].leader = "E"
+    played = [_play(board, "E")]
+    states.append(encode_board(board))
+    return (states, played)
+
+
+def test_patch_turns_one_state_into_the_next():
+    (states, _) = _states()
+    for old, new in zip(states, states[1:], strict=False):
+        patch = make_patch(old, new)
+        assert apply_patch(old, patch) == new
+        assert len(patch) < len(new)
+
+
+def test_changes_are_named():
+    (states, played) = _states()
+    (first, bid, card) = states
+    assert describe_change(None, first) == (DEAL, {})
+    assert describe_change(first, bid) == (
+        CALL,
+        {"calls": ["1NT", "P", "3NT", "P", "P", "P"]},
+    )
+    assert describe_change(bid, card) == (CARD, {"cards": played})
+    assert describe_change(card, bid) == (UNDO, {"calls": [], "cards": played})
+    other = encode_board(_dealt_board())
+    assert describe_change(card, other)[0] == DEAL
+
+
+def test_replay_starts_from_the_last_full_board():
+    (states, _) = _states()
+    rows = [
+        (7, b"", b"not a board"),
+        (8, b"", states[0]),
+        (9, make_patch(states[0], states[1]), b""),
+        (10, make_patch(states[1], states[2]), b""),
+    ]
+    assert replay(rows) == states[2]
+    assert replay(rows[:2]) == states[0]
+    assert replay([]) is None
+
+
+def test_replay_needs_every_event():
+    (states, _) = _states()
+    rows = [(1, b"", states[0]), (3, make_patch(states[1], states[2]), b"")]
+    with pytest.raises(GameLogError):
+        replay(rows)
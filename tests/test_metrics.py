@@ -0,0 +1,31 @@
+from common.metrics import Metrics, PhaseTimer
+
+
+def test_nested_phases_charge_the_innermost():
+    timer = PhaseTimer()
+    with timer.measure("context"):
+        with timer.measure("db"):
+            pass
+    assert set(timer.totals) == {"context", "db"}
+    assert all(seconds >= 0 for seconds in timer.totals.values())
+
+
+def test_record_adds_other_and_total():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    timer = PhaseTimer()
+    timer.totals = {"db": 0.05, "engine": 0.5}
+    metrics.record("card-played", timer, 0.6)
+    text = metrics.render()
+    assert (
+        'bfg_request_phase_seconds_bucket{endpoint="card-played",'
+        'phase="db",le="0.1"} 1'
+    ) in text
+    assert (
+        'bfg_request_phase_seconds_bucket{endpoint="card-played",'
+        'phase="engine",le="0.1"} 0'
+    ) in text
+    assert (
+        'bfg_request_phase_seconds_count{endpoint="card-played",'
+        'phase="total"} 1'
+    ) in text
+    assert 'phase="other"' in text
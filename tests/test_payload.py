@@ -0,0 +1,32 @@
+import gzip
+import json
+
+from common.payload import IDENTITY, Payload
+
+
+def test_encodings_decode_to_the_same_json():
+    payload = Payload.from_content({"calls": ["1C", "1D"]})
+    body = payload.encodings[IDENTITY]
+    assert json.loads(body) == {"calls": ["1C", "1D"]}
+    assert gzip.decompress(payload.encodings["gzip"]) == body
+
+
+def test_etag_depends_on_content():
+    assert (
+        Payload.from_content({"a": 1}).etag
+        == Payload.from_content({"a": 1}).etag
+    )
+    assert (
+        Payload.from_content({"a": 1}).etag
+        != Payload.from_content({"a": 2}).etag
+    )
+
+
+def test_negotiate():
+    payload = Payload.from_content({})
+    assert payload.negotiate("") == IDENTITY
+    assert payload.negotiate("gzip, deflate") == "gzip"
+    assert payload.negotiate("gzip;q=0") == IDENTITY
+    assert payload.negotiate("gzip;q=0.0") == IDENTITY
+    assert payload.negotiate("gzip; q=0") == IDENTITY
+    assert payload.negotiate("gzip;q=0.5, identity") == "gzip"
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from common import room_store
+from common.models import ArchivedBoard
+from common.room_store import (
+    ROOM_ID_KEY,
+    ROOM_KEY,
+    DjangoRoomStore,
+    MemoryRoomStore,
+    RedisRoomStore,
+    store_from_url,
+)
+from common.utilities import GameRequest
+
+
+class FakeWatchError(Exception):
+    pass
+
+
+class FakeRedis:
+    """The Redis commands RedisRoomStore uses, on dicts, as bytes."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.lists: dict[str, list[bytes]] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    def set(self, key: str, value: object, nx: bool = False) -> bool | None:
+        if nx and key in self.values:
+            return None
+        if not isinstance(value, bytes):
+            value = str(value).encode()
+        self.values[key] = value
+        return True
+
+    def incr(self, key: str) -> int:
+        value = int(self.values.get(key, b"0")) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    def lpush(self, key: str, value: bytes) -> None:
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def lrange(self, key: str, start: int, stop: int) -> list[bytes]:
+        values = self.lists.get(key, [])
+        return values[start:] if stop == -1 else values[start : stop + 1]
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.watched: dict[str, bytes | None] = {}
+        self.queued: list[tuple[str, bytes]] = []
+
+    def __enter__(self) -> "FakePipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def watch(self, key: str) -> None:
+        self.watched[key] = self.client.get(key)
+
+    def unwatch(self) -> None:
+        self.watched = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(key)
+
+    def multi(self) -> None:
+        self.queued = []
+
+    def set(self, key: str, value: bytes) -> None:
+        self.queued.append((key, value))
+
+    def execute(self) -> None:
+        watched, self.watched = self.watched, {}
+        if any(
+            self.client.get(key) != value for key, value in watched.items()
+        ):
+            raise FakeWatchError
+        for key, value in self.queued:
+            self.client.set(key, value)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemoryRoomStore()
+    return RedisRoomStore(FakeRedis(), FakeWatchError)
+
+
+def test_get_creates_each_room_once(store):
+    room = store.get("r1")
+    assert room.name == "r1"
+    assert store.get("r1").pk == room.pk
+    assert store.get("r2").pk != room.pk
+
+
+def test_get_returns_a_copy(store):
+    store.get("r1").board_version = 5
+    assert store.get("r1").board_version == 0
+
+
+def test_compare_and_set_writes_only_the_expected_version(store):
+    room = store.get("r1")
+    assert store.compare_and_set(
+        room, {"version": 0}, {"version": 1, "board_version": 3}
+    )
+    assert not store.compare_and_set(
+        room, {"version": 0}, {"version": 1, "board_version": 4}
+    )
+    stored = store.get("r1")
+    assert (stored.version, stored.board_version) == (1, 3)
+
+
+def test_append_archive_keeps_the_newest_first(store):
+    room = store.get("r1")
+    for pbn in ("first", "second"):
+        store.append_archive(room, ArchivedBoard(pbn=pbn))
+    assert [board.pbn for board in store.archive(room)] == [
+        "second",
+        "first",
+    ]
+    assert store.archive(store.get("r2")) == []
+
+
+def test_a_lost_claim_writes_no_room():
+    client = FakeRedis()
+    store = RedisRoomStore(client, FakeWatchError)
+    claim = client.set
+
+    def rival_claims_first(key, value, nx=False):
+        if nx and key == ROOM_ID_KEY.format("r1"):
+            client.set = claim
+            RedisRoomStore(client, FakeWatchError).get("r1")
+        return claim(key, value, nx)
+
+    client.set = rival_claims_first
+    room = store.get("r1")
+    rooms = [key for key in client.values if key.startswith("bfg:room:")]
+    assert rooms == [ROOM_KEY.format(room.pk)]
+
+
+def test_requests_read_rooms_from_the_current_store(monkeypatch):
+    store = MemoryRoomStore()
+    store.compare_and_set(store.get("r1"), {}, {"board_version": 7})
+    monkeypatch.setattr(room_store, "room_store", store)
+    assert GameRequest(room_name="r1").room.board_version == 7
+
+
+def test_a_request_that_needs_no_room_gets_none():
+    req = GameRequest(room_name="r1", needs_room=False)
+    with pytest.raises(RuntimeError):
+        _ = req.room
+    with pytest.raises(RuntimeError):
+        asyncio.run(req.aroom())
+
+
+def test_store_from_url():
+    assert isinstance(store_from_url(""), DjangoRoomStore)
+    assert isinstance(store_from_url("memory://"), MemoryRoomStore)
+    with pytest.raises(ImproperlyConfigured):
+        store_from_url("mongodb://localhost")
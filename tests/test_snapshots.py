@@ -0,0 +1,38 @@
+from common.snapshots import SnapshotCache, context_delta
+
+
+def test_delta_holds_only_changed_keys():
+    old = {"bid_history": ["1H"], "dealer": "N"}
+    new = {"bid_history": ["1H", "P"], "dealer": "N"}
+    assert context_delta(old, new) == {"bid_history": ["1H", "P"]}
+
+
+def test_delta_needs_the_same_keys():
+    assert context_delta({"dealer": "N"}, {"dealer": "N", "x": 1}) is None
+
+
+def test_snapshot_is_isolated_from_later_mutation():
+    cache = SnapshotCache(max_rooms=2, versions_per_room=2)
+    bid_history = ["1H"]
+    cache.put(1, 1, "solo", {"bid_history": bid_history})
+    bid_history.append("P")
+    assert cache.get(1, 1, "solo") == {"bid_history": ["1H"]}
+    assert cache.get(1, 1, "duo") is None
+
+
+def test_oldest_versions_and_rooms_are_evicted():
+    cache = SnapshotCache(max_rooms=2, versions_per_room=2)
+    for version in (1, 2, 3):
+        cache.put(1, version, "solo", {})
+    assert cache.get(1, 1, "solo") is None
+    assert cache.get(1, 3, "solo") == {}
+    cache.put(2, 1, "solo", {})
+    cache.put(3, 1, "solo", {})
+    assert cache.get(1, 3, "solo") is None
+
+
+def test_first_context_of_a_version_is_kept():
+    cache = SnapshotCache(max_rooms=2, versions_per_room=2)
+    cache.put(1, 1, "solo", {"makeable_tricks": None})
+    cache.put(1, 1, "solo", {"makeable_tricks": {"N": ["7"]}})
+    assert cache.get(1, 1, "solo") == {"makeable_tricks": None}
@@ -0,0 +1,47 @@
+import pytest
+
+from common.unit_of_work import (
+    StaleRoomError,
+    UnitOfWork,
+    after_flush,
+    run_in_unit_of_work,
+    unit_of_work,
+)
+
+
+def test_after_flush_waits_for_the_unit():
+    calls = []
+    with unit_of_work():
+        after_flush(lambda: calls.append("flushed"))
+        assert calls == []
+    assert calls == ["flushed"]
+
+
+def test_after_flush_is_dropped_when_the_unit_fails():
+    calls = []
+    with pytest.raises(ValueError):
+        with unit_of_work():
+            after_flush(lambda: calls.append("flushed"))
+            raise ValueError
+    assert calls == []
+
+
+def test_stale_room_is_run_again_then_raised():
+    attempts = []
+
+    def conflict():
+        attempts.append(1)
+        raise StaleRoomError
+
+    with pytest.raises(StaleRoomError):
+        run_in_unit_of_work(conflict, attempts=3)
+    assert len(attempts) == 3
+
+
+def test_after_flush_calls_travel_with_the_changes():
+    calls = []
+    with unit_of_work(flush=False) as unit:
+        after_flush(lambda: calls.append("flushed"))
+    assert calls == []
+    UnitOfWork.from_changes(unit.changes(), unit.after_flush_calls()).flush()
+    assert calls == ["flushed"]